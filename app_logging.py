@@ -0,0 +1,82 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+# --- CONFIGURATION ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Share of per-request records kept on hot routes (per word, per event); warnings and errors are never sampled
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.01))
+
+_configure_lock = threading.Lock()
+_listener = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, the record's fields and any traceback"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SampleFilter(logging.Filter):
+    """Keep a record with probability record.sample_rate (1 when unset)"""
+
+    def filter(self, record):
+        rate = getattr(record, "sample_rate", 1.0)
+        return rate >= 1 or record.levelno >= logging.WARNING or random.random() < rate
+
+
+def fields(sample_rate=1.0, **values):
+    """extra= for a log call: structured fields, optionally sampled
+
+    logger.info("Laid out words", extra=fields(word_count=n))
+    """
+    return {"fields": values, "sample_rate": sample_rate}
+
+
+def configure_logging():
+    """Send the "rsvp" loggers through a queue to a background thread writing JSON lines to stdout
+
+    Records are filtered and formatted on the calling thread, so sampled-out
+    records cost next to nothing and a slow stdout never stalls a request.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        log_queue = queue.SimpleQueue()
+        handler = logging.handlers.QueueHandler(log_queue)
+        handler.addFilter(SampleFilter())
+        handler.setFormatter(JSONFormatter())
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(logging.Formatter("%(message)s"))
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        logger = logging.getLogger("rsvp")
+        logger.setLevel(LOG_LEVEL)
+        logger.addHandler(handler)
+        logger.propagate = False
+
+
+def get_logger(name):
+    return logging.getLogger(f"rsvp.{name}")
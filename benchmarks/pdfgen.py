@@ -0,0 +1,51 @@
+"""Minimal text PDFs for benchmarking extraction, built without any PDF library"""
+import random
+
+WORDS = ("the quick brown fox jumps over lazy dog reading speed focal letter page "
+         "chapter sentence paragraph word blink pause resume audio voice text").split()
+
+LINES_PER_PAGE = 40
+WORDS_PER_LINE = 10
+
+
+def page_text(rng):
+    lines = []
+    for _ in range(LINES_PER_PAGE):
+        lines.append(" ".join(rng.choice(WORDS) for _ in range(WORDS_PER_LINE)))
+    return lines
+
+
+def _content_stream(lines):
+    ops = ["BT", "/F1 11 Tf", "14 TL", "72 740 Td"]
+    for line in lines:
+        ops.append(f"({line}) Tj T*")
+    ops.append("ET")
+    return "\n".join(ops)
+
+
+def make_pdf(pages, seed=0):
+    """A PDF of the given page count; different seeds give different bytes (and cache keys)"""
+    rng = random.Random(seed)
+    font = 3 + 2 * pages
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(" ".join(f"{3 + 2 * i} 0 R" for i in range(pages)), pages),
+    ]
+    for i in range(pages):
+        stream = _content_stream(page_text(rng))
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {4 + 2 * i} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
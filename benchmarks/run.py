@@ -0,0 +1,578 @@
+"""Benchmark and load-test suite for the Flask API
+
+    python -m benchmarks.run                   # full suite, compared with benchmarks/baseline.json
+    python -m benchmarks.run --quick           # smaller documents and fewer requests
+    python -m benchmarks.run --save-baseline   # record this machine's numbers as the baseline
+    python -m benchmarks.run --only pdf blink  # just the cases whose names contain these
+
+Runs against a scratch data directory, with the fake TTS synthesizer, through
+the Flask test client and (for concurrency and streaming) a real threaded
+server on a free port. Exits 1 if any case regressed past the tolerance.
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import queue
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# A case regresses when it is this much slower (or this much less throughput) than the baseline
+DEFAULT_TOLERANCE = 0.5
+# Latency changes smaller than this are noise, whatever the ratio
+MIN_DELTA_MS = 2.0
+
+
+def prepare_environment(directory):
+    """Point every store at a scratch directory; must run before main is imported"""
+    os.chdir(directory)
+    os.environ.update({
+        "SESSION_DB_PATH": os.path.join(directory, "data", "sessions.db"),
+        "EVENT_LOG_DIR": os.path.join(directory, "data", "events"),
+        "DOC_CACHE_DIR": os.path.join(directory, "cache", "documents"),
+        "WORD_STORE_DIR": os.path.join(directory, "cache", "words"),
+        "TTS_SYNTHESIZER": "fake",
+        "ELEVENLABS_API_KEY": "",
+        # Keep the report readable; the per-request logs still go through the queue and filter
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    })
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its (PDF worker) children so far"""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) * 1024 / scale / 1024, 1)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(name, latencies, elapsed, **extra):
+    latencies = sorted(latencies)
+    result = {
+        "name": name,
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    result.update(extra)
+    return result
+
+
+def timed(calls, fn):
+    """Run fn(i) calls times, returning the per-call latencies and the total elapsed time"""
+    latencies = []
+    started = time.perf_counter()
+    for i in range(calls):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - started
+
+
+def check(response, status=200):
+    if response.status_code != status:
+        raise AssertionError(f"{response.request.path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+
+class LiveServer:
+    """The app on a real threaded werkzeug server, on a free local port"""
+
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+
+    def connection(self):
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+
+
+def post_json(connection, path, body, headers=None):
+    connection.request("POST", path, body=json.dumps(body),
+                       headers={"Content-Type": "application/json", **(headers or {})})
+    response = connection.getresponse()
+    data = response.read()
+    if response.status >= 400:
+        raise AssertionError(f"{path} returned {response.status}: {data[:200]!r}")
+    return data
+
+
+# --- cases ---
+
+def bench_extract_pdf(client, page_counts, repeats):
+    from benchmarks.pdfgen import make_pdf
+
+    # Start the extraction pool outside the measurements; a server pays this once
+    check(client.post("/api/extract-pdf?text=0", data={"file": (io.BytesIO(make_pdf(16, seed=-1)), "warmup.pdf")}))
+
+    results = []
+    for pages in page_counts:
+        # A fresh seed per request so every cold run misses the document cache
+        documents = [make_pdf(pages, seed=pages * 1000 + i) for i in range(repeats[pages] + 1)]
+
+        def extract(i, stream=False):
+            path = "/api/extract-pdf?stream=1&layout=0" if stream else "/api/extract-pdf?text=0&layout=0"
+            response = client.post(path, data={"file": (io.BytesIO(documents[i]), "bench.pdf")})
+            check(response)
+            if stream:
+                # Time to the first page record is what a reader waits for
+                lines = response.response
+                next(lines)  # meta
+                next(lines)  # first page
+                response.close()
+
+        latencies, elapsed = timed(repeats[pages], extract)
+        results.append(summarize(f"extract_pdf[{pages}p,cold]", latencies, elapsed, pages=pages))
+
+        latencies, elapsed = timed(repeats[pages] * 2, lambda i: extract(0))
+        results.append(summarize(f"extract_pdf[{pages}p,cached]", latencies, elapsed, pages=pages))
+
+        if pages >= 100:
+            latencies, elapsed = timed(1, lambda i: extract(repeats[pages], stream=True))
+            results.append(summarize(f"extract_pdf_first_page[{pages}p,cold]", latencies, elapsed, pages=pages))
+    return results
+
+
+def bench_process_word(client, calls):
+    from benchmarks.pdfgen import WORDS
+
+    words = [word * (1 + i % 3) for i, word in enumerate(WORDS)]
+    latencies, elapsed = timed(calls, lambda i: check(client.post("/api/process-word", json={"word": words[i % len(words)]})))
+    return [summarize("process_word", latencies, elapsed)]
+
+
+def bench_process_text(client, words):
+    from benchmarks.pdfgen import WORDS
+
+    texts = [" ".join(WORDS[(i * 7 + j) % len(WORDS)] for j in range(words)) + f" nonce{i}" for i in range(6)]
+    latencies, elapsed = timed(len(texts), lambda i: check(client.post("/api/process-text", json={"text": texts[i], "wpm": 300, "directions": True})))
+    return [summarize(f"process_text[{words}w]", latencies, elapsed)]
+
+
+def bench_events(server, threads, batches, batch_size):
+    """Concurrent batched ingestion from several clients, then paging it back out"""
+    latencies = []
+    lock = threading.Lock()
+    errors = []
+
+    def client(worker):
+        connection = server.connection()
+        own = []
+        try:
+            for batch in range(batches):
+                events = [{"event_type": "word_jumped", "word_index": i, "file_name": f"bench{worker}.pdf"}
+                          for i in range(batch_size)]
+                t0 = time.perf_counter()
+                post_json(connection, "/api/events", {"events": events}, {"X-Session-Id": f"bench-{worker}"})
+                own.append(time.perf_counter() - t0)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+        with lock:
+            latencies.extend(own)
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+
+    results = [summarize(f"events_ingest[{threads}x{batch_size}]", latencies, elapsed,
+                         events_per_second=round(len(latencies) * batch_size / elapsed, 1))]
+
+    connection = server.connection()
+    cursor = ""
+
+    def page(i):
+        nonlocal cursor
+        connection.request("GET", f"/api/events?limit=500&cursor={cursor}")
+        body = json.loads(connection.getresponse().read())
+        cursor = body["next_cursor"]
+
+    latencies, elapsed = timed(max(1, threads * batches * batch_size // 500), page)
+    connection.close()
+    results.append(summarize("events_page[500]", latencies, elapsed))
+    return results
+
+
+def bench_blink(server, transitions):
+    """Detector POST to reader SSE delivery, over a real connection"""
+    messages = queue.Queue()
+    ready = threading.Event()
+
+    def listen():
+        connection = server.connection()
+        connection.request("GET", "/blink/stream?session=bench-blink")
+        response = connection.getresponse()
+        ready.set()
+        while True:
+            line = response.readline()
+            if not line:
+                break
+            if line.startswith(b"data: "):
+                messages.put((time.perf_counter(), json.loads(line[6:])))
+
+    threading.Thread(target=listen, daemon=True).start()
+    ready.wait(10)
+    messages.get(timeout=10)  # the current state, sent on connect
+
+    connection = server.connection()
+    latencies = []
+    started = time.perf_counter()
+    for i in range(transitions):
+        state = "closed" if i % 2 == 0 else "open"
+        t0 = time.perf_counter()
+        post_json(connection, "/blink", {"state": state, "sent_at": time.time(), "session": "bench-blink"})
+        while True:
+            received, message = messages.get(timeout=10)
+            if message["state"] == state:
+                break
+        latencies.append(received - t0)
+    elapsed = time.perf_counter() - started
+    connection.close()
+    return [summarize("blink_round_trip", latencies, elapsed)]
+
+
+def eye_landmarks(openness):
+    """12 [x, y] eye landmarks, left eye then right, with an EAR of openness"""
+    points = []
+    for x0 in (0, 60):
+        half = 30 * openness / 2
+        points += [[x0, 0], [x0 + 10, -half], [x0 + 20, -half], [x0 + 30, 0], [x0 + 20, half], [x0 + 10, half]]
+    return points
+
+
+def get_json(server, path):
+    connection = server.connection()
+    connection.request("GET", path)
+    data = json.loads(connection.getresponse().read())
+    connection.close()
+    return data
+
+
+def bench_blink_ingest(server, session_counts, frames):
+    """Server-side blink detection: every session streams eye points as fast as it gets answers"""
+    opened, closed = eye_landmarks(0.3), eye_landmarks(0.1)
+    # The first frame starts the worker pool; keep that out of the measurements
+    connection = server.connection()
+    post_json(connection, "/api/blink/frame?session=bench-ingest-warm-up", {"points": opened})
+    connection.close()
+
+    results = []
+    for sessions in session_counts:
+        before = get_json(server, "/api/blink/stats")["blink"]
+        latencies = []
+        lock = threading.Lock()
+
+        def reader(n):
+            connection = server.connection()
+            own = []
+            for i in range(frames):
+                # A blink every 10 frames, so some frames are transitions written to the store
+                body = {"points": closed if i % 10 == 9 else opened, "sent_at": time.time()}
+                t0 = time.perf_counter()
+                post_json(connection, f"/api/blink/frame?session=bench-ingest-{n}", body)
+                own.append(time.perf_counter() - t0)
+            connection.close()
+            with lock:
+                latencies.extend(own)
+
+        workers = [threading.Thread(target=reader, args=(n,)) for n in range(sessions)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        after = get_json(server, "/api/blink/stats")["blink"]
+        batches = after["batches"] - before.get("batches", 0)
+        results.append(summarize(
+            f"blink_ingest[{sessions} sessions]", latencies, elapsed,
+            workers=after["workers"],
+            mean_batch_size=round((after["frames"] - before.get("frames", 0)) / batches, 2) if batches else 0,
+            frames_per_core_second=after["frames_per_core_second"]))
+    return results
+
+
+def bench_jobs(client, server, jobs, pages):
+    """Short requests while PDF extraction jobs run in the background, and how long the jobs take"""
+    from benchmarks.pdfgen import make_pdf
+
+    documents = [make_pdf(pages, seed=50_000 + pages * 100 + i) for i in range(jobs)]
+    started = time.perf_counter()
+    submitted = {}
+    for i, document in enumerate(documents):
+        response = check(client.post(f"/api/jobs/extract-pdf?session=bench-job-{i}",
+                                      data={"file": (io.BytesIO(document), f"job{i}.pdf")}), 202)
+        submitted[response.get_json()["job_id"]] = time.perf_counter()
+
+    connection = server.connection()
+    latencies = []
+    durations = []
+    while submitted:
+        for _ in range(20):
+            t0 = time.perf_counter()
+            post_json(connection, "/api/process-word", {"word": "benchmark"})
+            latencies.append(time.perf_counter() - t0)
+        for job_id, submitted_at in list(submitted.items()):
+            job = client.get(f"/api/jobs/{job_id}").get_json()
+            if job["state"] == "done":
+                durations.append(time.perf_counter() - submitted_at)
+                del submitted[job_id]
+            elif job["state"] not in ("queued", "running"):
+                raise AssertionError(f"job {job_id} ended {job['state']}: {job.get('error')}")
+    elapsed = time.perf_counter() - started
+    connection.close()
+    return [summarize(f"process_word_during_jobs[{jobs}x{pages}p]", latencies, elapsed),
+            summarize(f"pdf_job[{jobs}x{pages}p]", durations, elapsed)]
+
+
+def bench_tts(client, runs, sentences):
+    def generate(i):
+        text = " ".join(f"Sentence {j} of benchmark run {i} reads aloud." for j in range(sentences))
+        data = check(client.post("/api/generate-tts", json={"text": text, "wpm": 300})).get_json()
+        audio = check(client.get(data["audio_url"]))
+        audio.get_data()
+
+    latencies, elapsed = timed(runs, generate)
+    return [summarize(f"generate_tts[{sentences}s,fake]", latencies, elapsed)]
+
+
+def bench_routes(client, calls):
+    """The cheap routes, so a slowdown in shared middleware or stores shows up"""
+    document_id = check(client.post("/api/process-text", json={"text": "route sweep " * 200})).get_json()["document_id"]
+    routes = {
+        "GET /": lambda: client.get("/"),
+        "GET /api/data": lambda: client.get("/api/data"),
+        "POST /api/echo": lambda: client.post("/api/echo", json={"ping": 1}),
+        "GET /blink_state": lambda: client.get("/blink_state?session=bench"),
+        "GET /api/session": lambda: client.get("/api/session?session=bench"),
+        "GET /api/cache/stats": lambda: client.get("/api/cache/stats"),
+        "GET /api/events/stats": lambda: client.get("/api/events/stats"),
+        "GET /api/events/recent": lambda: client.get("/api/events/recent?limit=50"),
+        "GET /api/tts/stats": lambda: client.get("/api/tts/stats"),
+        "GET /api/documents/<id>": lambda: client.get(f"/api/documents/{document_id}"),
+        "GET /api/documents/<id>/words": lambda: client.get(f"/api/documents/{document_id}/words?start=100&count=200"),
+        "GET /api/documents/<id>/search": lambda: client.get(f"/api/documents/{document_id}/search?q=swe&after=10"),
+    }
+    results = []
+    for name, call in routes.items():
+        latencies, elapsed = timed(calls, lambda i: check(call()))
+        results.append(summarize(f"route[{name}]", latencies, elapsed))
+    return results
+
+
+# Run in a fresh interpreter per sample, since startup only happens once per process
+STARTUP_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app(warm=False)
+created = time.perf_counter()
+client = app.test_client()
+client.get("/")
+first = time.perf_counter()
+client.post("/api/process-text", json={"text": f"Language detection loads on this request {time.time_ns()}."})
+print(json.dumps({"import": imported - started, "create_app": created - imported,
+                  "first_request": first - created, "first_text_request": time.perf_counter() - first}))
+"""
+
+
+def bench_startup(runs):
+    """Worker spin-up: importing main, create_app(), the first request and the first one needing langdetect"""
+    import subprocess
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root, LOG_LEVEL="WARNING")
+    samples = {}
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], env=env, check=True,
+                                capture_output=True, text=True).stdout
+        for phase, seconds in json.loads(output.splitlines()[-1]).items():
+            samples.setdefault(phase, []).append(seconds)
+    return [summarize(f"startup[{phase}]", latencies, sum(latencies)) for phase, latencies in samples.items()]
+
+
+# --- baseline ---
+
+def compare(results, baseline, tolerance):
+    """Return a line per regression against the baseline"""
+    regressions = []
+    for result in results:
+        base = baseline.get(result["name"])
+        if not base:
+            continue
+        for key, allowed in (("p50_ms", tolerance), ("p99_ms", tolerance * 2)):
+            if result[key] > base[key] * (1 + allowed) and result[key] - base[key] > MIN_DELTA_MS:
+                regressions.append(f"{result['name']}: {key} {result[key]} vs baseline {base[key]}")
+        # Throughput is judged like latency: the per-request time must grow by more than noise
+        slower_by_ms = (1000 / result["throughput_rps"] - 1000 / base["throughput_rps"]
+                        if result["throughput_rps"] and base["throughput_rps"] else 0.0)
+        if (base["throughput_rps"] and result["throughput_rps"] < base["throughput_rps"] / (1 + tolerance)
+                and slower_by_ms > MIN_DELTA_MS):
+            regressions.append(f"{result['name']}: throughput {result['throughput_rps']}/s "
+                               f"vs baseline {base['throughput_rps']}/s")
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{result['name']}: peak RSS {result['peak_rss_mb']}MB vs baseline {base['peak_rss_mb']}MB")
+    return regressions
+
+
+def read_baseline_file(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"modes": {}}
+
+
+def load_baseline(path, mode):
+    """Baseline cases for one mode ("full" or "quick"), by name"""
+    cases = read_baseline_file(path)["modes"].get(mode, {}).get("cases", [])
+    return {case["name"]: case for case in cases}
+
+
+def save_baseline(path, mode, results):
+    data = read_baseline_file(path)
+    cases = load_baseline(path, mode)
+    cases.update({result["name"]: result for result in results})
+    data["modes"][mode] = {"recorded_at": time.strftime("%Y-%m-%d"), "cases": list(cases.values())}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+STANDARD_FIELDS = {"name", "requests", "p50_ms", "p99_ms", "throughput_rps", "peak_rss_mb"}
+
+
+def format_table(results):
+    lines = [f"{'case':<44}{'n':>6}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}{'RSS MB':>9}"]
+    for r in results:
+        # Case-specific numbers (batch sizes, per-core throughput) trail the row
+        extra = "  ".join(f"{key}={value}" for key, value in r.items() if key not in STANDARD_FIELDS)
+        lines.append(f"{r['name']:<44}{r['requests']:>6}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+                     f"{r['throughput_rps']:>10.1f}{r['peak_rss_mb']:>9.1f}  {extra}".rstrip())
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the reader's Flask API")
+    parser.add_argument("--quick", action="store_true", help="smaller documents and fewer requests")
+    parser.add_argument("--only", nargs="*", default=[], help="run only cases whose group name contains one of these")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare with or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="record these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown as a fraction of the baseline (p99 gets twice this)")
+    parser.add_argument("--output", help="also write the results as JSON here")
+    args = parser.parse_args()
+
+    baseline_path = os.path.abspath(args.baseline)
+    output_path = os.path.abspath(args.output) if args.output else None
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    scratch = tempfile.TemporaryDirectory(prefix="rsvp-bench-")
+    prepare_environment(scratch.name)
+
+    real_stdout = sys.stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as server_main
+        app = server_main.create_app()
+        # Measure the warm server: wait for the warm-up thread (startup has its own group)
+        for subsystem in server_main.SUBSYSTEMS:
+            subsystem.resolve()
+    client = app.test_client()
+
+    mode = "quick" if args.quick else "full"
+    if args.quick:
+        page_counts, repeats = [1, 10, 100], {1: 10, 10: 5, 100: 2}
+        scale = 1
+        session_counts = [1, 8, 32]
+    else:
+        page_counts, repeats = [1, 10, 100, 1000], {1: 30, 10: 10, 100: 3, 1000: 1}
+        scale = 4
+        session_counts = [1, 8, 32, 128]
+
+    groups = {
+        "pdf": lambda: bench_extract_pdf(client, page_counts, repeats),
+        "word": lambda: bench_process_word(client, 500 * scale),
+        "text": lambda: bench_process_text(client, 2000 * scale),
+        "events": lambda: bench_events(live, threads=8, batches=10 * scale, batch_size=50),
+        "blink": lambda: bench_blink(live, transitions=50 * scale),
+        "blink_ingest": lambda: bench_blink_ingest(live, session_counts=session_counts, frames=50 * scale),
+        "jobs": lambda: bench_jobs(client, live, jobs=2 * scale + 2, pages=100),
+        "tts": lambda: bench_tts(client, runs=5 * scale, sentences=12),
+        "routes": lambda: bench_routes(client, calls=50 * scale),
+        "startup": lambda: bench_startup(runs=3 * scale),
+    }
+
+    results = []
+    with LiveServer(app) as live:
+        for group, run in groups.items():
+            if args.only and not any(name in group for name in args.only):
+                continue
+            print(f"running {group}...", file=real_stdout, flush=True)
+            # Request logging would flood the report, so it goes nowhere while measuring
+            with contextlib.redirect_stdout(io.StringIO()):
+                results.extend(run())
+
+    print(format_table(results))
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        save_baseline(baseline_path, mode, results)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    baseline = load_baseline(baseline_path, mode)
+    if not baseline:
+        print("No baseline to compare with; record one with --save-baseline")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%} of the baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions beyond {args.tolerance:.0%} of the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
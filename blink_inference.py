@@ -0,0 +1,221 @@
+import importlib.util
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+# --- CONFIGURATION ---
+EAR_THRESHOLD = 0.20
+
+LEFT_EYE = [362, 385, 387, 263, 373, 380]
+RIGHT_EYE = [33, 160, 158, 133, 153, 144]
+# Only these 12 landmarks are ever read from the face mesh
+EYE_INDICES = LEFT_EYE + RIGHT_EYE
+
+# Processes computing EAR (and running the face mesh on frames); 0 computes on a thread of this process
+BLINK_WORKERS = int(os.getenv("BLINK_WORKERS", min(2, os.cpu_count() or 1)))
+# A batch closes at this many frames, or this long after its first frame arrived
+MAX_BATCH = 64
+BATCH_WAIT_SECONDS = 0.002
+# Batches handed to the pool at once per worker; while they run, new frames gather into the next batch
+BATCHES_PER_WORKER = 2
+# Frames waiting for a batch beyond this are refused, so a backlog can't grow without bound
+MAX_PENDING = 1024
+# Latency samples kept for stats(); percentiles cover the most recent ones
+STATS_WINDOW = 10000
+
+
+def calculate_ear(eye_points):
+    """Eye aspect ratio for an (..., 6, 2) array of eye landmarks, vectorized over leading axes"""
+    v1 = np.linalg.norm(eye_points[..., 1, :] - eye_points[..., 5, :], axis=-1)
+    v2 = np.linalg.norm(eye_points[..., 2, :] - eye_points[..., 4, :], axis=-1)
+    h = np.linalg.norm(eye_points[..., 0, :] - eye_points[..., 3, :], axis=-1)
+    return (v1 + v2) / (2.0 * h)
+
+
+def eye_points(landmarks, width, height, offset=(0, 0)):
+    """Pixel coordinates of the 12 eye landmarks as a (2, 6, 2) array: left eye, right eye"""
+    points = np.array([(landmarks[i].x, landmarks[i].y) for i in EYE_INDICES], dtype=np.float32)
+    points *= (width, height)
+    points += offset
+    return points.reshape(2, 6, 2)
+
+
+def parse_points(value):
+    """(2, 6, 2) array from 12 [x, y] pairs, left eye then right eye in EYE_INDICES order"""
+    try:
+        points = np.asarray(value, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError("points must be 12 [x, y] pairs")
+    if points.shape != (12, 2) or not np.isfinite(points).all():
+        raise ValueError("points must be 12 [x, y] pairs")
+    return points.reshape(2, 6, 2)
+
+
+def eye_state(ear):
+    if ear is None:
+        return "unknown"
+    return "closed" if ear < EAR_THRESHOLD else "open"
+
+
+def frames_supported():
+    """Whether this host can find eyes in raw frames (OpenCV and MediaPipe installed)"""
+    return all(importlib.util.find_spec(name) is not None for name in ("cv2", "mediapipe"))
+
+
+_face_mesh = None
+
+
+def _frame_points(data):
+    """Worker side: eye points in one encoded image, or None when no face is found"""
+    global _face_mesh
+    import cv2
+    if _face_mesh is None:
+        import mediapipe as mp
+        # Consecutive frames come from different readers, so nothing is tracked between them
+        _face_mesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=True, refine_landmarks=True)
+
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    results = _face_mesh.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    if not results.multi_face_landmarks:
+        return None
+    height, width = image.shape[:2]
+    return eye_points(results.multi_face_landmarks[0].landmark, width, height)
+
+
+def infer_batch(points, frames):
+    """Worker task: average EAR for a (n, 2, 6, 2) array of eye points and for a list of encoded frames
+
+    Returns (point EARs, frame EARs with None where no face was found, compute seconds).
+    """
+    started = time.perf_counter()
+    point_ears = calculate_ear(points).mean(axis=-1).tolist() if len(points) else []
+    frame_ears = []
+    for data in frames:
+        found = _frame_points(data)
+        frame_ears.append(None if found is None else float(calculate_ear(found).mean()))
+    return point_ears, frame_ears, time.perf_counter() - started
+
+
+def _start_method():
+    # Forking a threaded server copies its held locks into the workers; forkserver
+    # starts them from a clean process instead (spawn where it doesn't exist)
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+class BlinkBatcher:
+    """Gathers frames from every session into micro-batches computed on a process pool
+
+    One thread takes frames off a bounded queue. A batch closes at MAX_BATCH
+    frames or BATCH_WAIT_SECONDS after its first, and goes to the pool as one
+    task. At most BATCHES_PER_WORKER batches per worker are in flight. While
+    they run, arriving frames keep gathering, so batches grow with load instead
+    of the backlog.
+    """
+
+    def __init__(self, workers=BLINK_WORKERS, max_batch=MAX_BATCH, max_wait=BATCH_WAIT_SECONDS,
+                 max_pending=MAX_PENDING):
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pending = queue.Queue(maxsize=max_pending)
+        if workers:
+            self.executor = ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=multiprocessing.get_context(_start_method()))
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        self.in_flight = threading.BoundedSemaphore(max(1, workers) * BATCHES_PER_WORKER)
+
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.batches = 0
+        self.compute_seconds = 0.0
+        self.latencies = deque(maxlen=STATS_WINDOW)
+        self.batch_sizes = deque(maxlen=STATS_WINDOW)
+
+        threading.Thread(target=self._run, name="blink-batcher", daemon=True).start()
+
+    def submit(self, points=None, frame=None):
+        """Queue eye points (a (2, 6, 2) array) or an encoded frame; the Future resolves to
+        {"ear", "state", "batch_size"}. Raises queue.Full when the backlog is at its limit.
+        """
+        future = Future()
+        self.pending.put_nowait((time.perf_counter(), points, frame, future))
+        return future
+
+    def _collect(self):
+        batch = [self.pending.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            self.in_flight.acquire()
+            batch = self._collect()
+            point_items = [item for item in batch if item[2] is None]
+            frame_items = [item for item in batch if item[2] is not None]
+            points = np.stack([item[1] for item in point_items]) if point_items else np.empty((0, 2, 6, 2), np.float32)
+            try:
+                task = self.executor.submit(infer_batch, points, [item[2] for item in frame_items])
+            except Exception as e:
+                self.in_flight.release()
+                for item in batch:
+                    item[3].set_exception(e)
+                continue
+            task.add_done_callback(lambda task, items=point_items + frame_items: self._finish(items, task))
+
+    def _finish(self, items, task):
+        self.in_flight.release()
+        try:
+            point_ears, frame_ears, seconds = task.result()
+        except Exception as e:
+            for item in items:
+                item[3].set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        size = len(items)
+        with self.lock:
+            self.frames += size
+            self.batches += 1
+            self.compute_seconds += seconds
+            self.batch_sizes.append(size)
+            self.latencies.extend(finished - item[0] for item in items)
+        for item, ear in zip(items, point_ears + frame_ears):
+            item[3].set_result({"ear": ear, "state": eye_state(ear), "batch_size": size})
+
+    def stats(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            sizes = np.array(self.batch_sizes)
+            frames, batches, compute_seconds = self.frames, self.batches, self.compute_seconds
+        result = {
+            "workers": self.workers,
+            "frames": frames,
+            "batches": batches,
+            "pending": self.pending.qsize(),
+            "mean_batch_size": round(float(sizes.mean()), 2) if len(sizes) else 0,
+            # Frames per second of worker compute, i.e. what one busy core sustains
+            "frames_per_core_second": round(frames / compute_seconds, 1) if compute_seconds else 0
+        }
+        if len(latencies):
+            result["latency_ms"] = {
+                "p50": round(float(np.percentile(latencies, 50)), 3),
+                "p99": round(float(np.percentile(latencies, 99)), 3),
+                "max": round(float(latencies.max()), 3)
+            }
+        return result
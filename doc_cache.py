@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from sqlite_pool import ConnectionPool
+
+# --- CONFIGURATION ---
+CACHE_DIR = os.getenv("DOC_CACHE_DIR", os.path.join("cache", "documents"))
+CACHE_MAX_BYTES = int(os.getenv("DOC_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Bump when the shape of cached entries changes so stale entries read as misses
+ENTRY_VERSION = 2
+INDEX_FILE = "index.db"
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)",
+)
+
+
+def content_key(data):
+    """Cache key for an uploaded file: the SHA-256 of its bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_content_key(key):
+    """Whether key could have come from content_key(), checked before it is used in a path"""
+    return len(key) == 64 and all(ch in "0123456789abcdef" for ch in key)
+
+
+class DocumentCache:
+    """On-disk store of extracted documents with size-bounded LRU eviction
+
+    Each entry is one JSON file named after the content key. Sizes, recency
+    and hit/miss counters live in a SQLite index next to the files, so every
+    worker process sees the same entries, evicts in the same LRU order and
+    reports the same stats.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        os.makedirs(directory, exist_ok=True)
+        self.pool = ConnectionPool(os.path.join(directory, INDEX_FILE))
+        with self.pool.transaction() as db:
+            for statement in SCHEMA:
+                db.execute(statement)
+            if db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0:
+                self._load_index(db)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self, db):
+        """Index entry files left by a cache that predates the index"""
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            db.execute("INSERT OR IGNORE INTO entries (key, size, last_used) VALUES (?, ?, ?)",
+                       (name[:-len(".json")], stat.st_size, stat.st_mtime))
+
+    @staticmethod
+    def _bump(db, name, amount=1):
+        db.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                   "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
+    def get(self, key):
+        """Return the cached entry for key, or None on a miss"""
+        with self.pool.connection() as db:
+            indexed = db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+        entry = None
+        if indexed:
+            try:
+                with open(self._path(key), encoding="utf-8") as f:
+                    entry = json.load(f)
+                if entry.get("version") != ENTRY_VERSION:
+                    raise ValueError("stale cache entry")
+            except (OSError, ValueError):
+                # Entry vanished, is corrupt or is stale: drop it and count a miss
+                entry = None
+
+        with self.pool.transaction() as db:
+            if entry is None:
+                if indexed:
+                    db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._bump(db, "misses")
+            else:
+                db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._bump(db, "hits")
+        return entry
+
+    def put(self, key, entry):
+        entry = dict(entry, version=ENTRY_VERSION)
+        payload = json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if len(payload) > self.max_bytes:
+            return
+
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, self._path(key))
+
+        with self.pool.transaction() as db:
+            db.execute(
+                "INSERT INTO entries (key, size, last_used) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET size = excluded.size, last_used = excluded.last_used",
+                (key, len(payload), time.time())
+            )
+            self._evict(db)
+
+    def _evict(self, db):
+        """Drop least recently used entries until the cache fits; runs inside put()'s transaction"""
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        self._bump(db, "evictions", evicted)
+
+    def stats(self):
+        with self.pool.connection() as db:
+            entries, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            counters = dict(db.execute("SELECT name, value FROM counters").fetchall())
+
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
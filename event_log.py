@@ -0,0 +1,322 @@
+import json
+import os
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads within one process are serialized
+    fcntl = None
+
+# --- CONFIGURATION ---
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", os.path.join("data", "events"))
+# A new segment is started once the current one grows past this size
+SEGMENT_MAX_BYTES = int(os.getenv("EVENT_SEGMENT_MAX_BYTES", 4 * 1024 * 1024))
+# Oldest segments beyond this many are deleted on rotation
+MAX_SEGMENTS = int(os.getenv("EVENT_MAX_SEGMENTS", 64))
+# Recent events kept in memory for /api/events/recent
+TAIL_SIZE = 1000
+# Lines a single paginated read may scan while looking for filtered matches
+MAX_SCAN_LINES = 20000
+# Counters are snapshotted to disk this often so startup only replays what came after
+SNAPSHOT_EVERY = 500
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+SNAPSHOT_FILE = "counters.json"
+LOCK_FILE = ".lock"
+
+
+def format_cursor(segment, offset):
+    return f"{segment}:{offset}"
+
+
+def parse_cursor(cursor):
+    """Inverse of format_cursor; raises ValueError on anything malformed"""
+    segment, offset = cursor.split(":")
+    segment, offset = int(segment), int(offset)
+    if segment < 0 or offset < 0:
+        raise ValueError("negative cursor")
+    return segment, offset
+
+
+class EventLog:
+    """Append-only event log stored as rotating JSONL segments
+
+    Reads page through the segments with opaque cursors ("segment:offset").
+    Several worker processes may share one directory: every operation holds
+    an exclusive lock on the directory, and each process keeps its counters
+    current by reading whatever was appended since it last looked, so they
+    cover every event ever logged, including those in segments since deleted.
+    """
+
+    def __init__(self, directory=EVENT_LOG_DIR, segment_max_bytes=SEGMENT_MAX_BYTES,
+                 max_segments=MAX_SEGMENTS, tail_size=TAIL_SIZE):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_segments = max_segments
+        self.lock = threading.Lock()
+        self.tail = deque(maxlen=tail_size)
+        self.segments = []
+        self._file = None
+        self._reset_counters()
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, LOCK_FILE), "a")
+
+        with self._locked():
+            self._load_counters()
+            self._catch_up()
+
+    @contextmanager
+    def _locked(self):
+        with self.lock:
+            if fcntl:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                self._sync()
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    # --- segments ---
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{segment:06d}{SEGMENT_SUFFIX}")
+
+    def _list_segments(self):
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                segments.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(segments)
+
+    def _open_segment(self, segment):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self._segment_path(segment), "ab")
+
+    def _sync(self):
+        """Pick up rotations, retention and clears done by other processes"""
+        segments = self._list_segments() or [0]
+        stale = (self._file is None or segments[-1] != self.segments[-1]
+                 or os.fstat(self._file.fileno()).st_nlink == 0)
+        self.segments = segments
+        if stale:
+            self._open_segment(segments[-1])
+        self._check_snapshot()
+
+    def _rotate(self):
+        self.segments.append(self.segments[-1] + 1)
+        self._open_segment(self.segments[-1])
+
+        while len(self.segments) > self.max_segments:
+            try:
+                os.remove(self._segment_path(self.segments.pop(0)))
+            except OSError:
+                pass
+
+    # --- counters ---
+
+    def _reset_counters(self):
+        self.total = 0
+        self.by_type = Counter()
+        self.wpm_changes_by_file = Counter()
+        self.searches_by_file = Counter()
+        self.epoch = 0
+        self._counted = None  # cursor up to which the counters are current
+        self._since_snapshot = 0
+        self._snapshot_mtime = None
+
+    def _count(self, event):
+        event_type = event.get("event_type")
+        file_name = event.get("file_name") or ""
+        self.total += 1
+        self.by_type[event_type] += 1
+        if event_type == "wpm_changed":
+            self.wpm_changes_by_file[file_name] += 1
+        elif event_type == "word_searched":
+            self.searches_by_file[file_name] += 1
+
+    def _catch_up(self):
+        """Count the events appended (by any process) since the last call"""
+        for event, position in self._scan(self._counted):
+            self._count(event)
+            self.tail.append(event)
+            self._counted = position
+            self._since_snapshot += 1
+
+        if self._since_snapshot >= SNAPSHOT_EVERY:
+            self._save_counters()
+
+    def _snapshot_path(self):
+        return os.path.join(self.directory, SNAPSHOT_FILE)
+
+    def _save_counters(self):
+        snapshot = {
+            "epoch": self.epoch,
+            "cursor": self._counted,
+            "total": self.total,
+            "by_type": self.by_type,
+            "wpm_changes_by_file": self.wpm_changes_by_file,
+            "searches_by_file": self.searches_by_file
+        }
+        path = self._snapshot_path()
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(f"{path}.tmp", path)
+        self._since_snapshot = 0
+        self._snapshot_mtime = os.stat(path).st_mtime_ns
+
+    def _load_counters(self):
+        """Restore counters from the last snapshot; _catch_up() replays what came after it"""
+        path = self._snapshot_path()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            counters = (Counter(snapshot["by_type"]), Counter(snapshot["wpm_changes_by_file"]),
+                        Counter(snapshot["searches_by_file"]))
+        except (OSError, ValueError, KeyError):
+            return
+
+        self.by_type, self.wpm_changes_by_file, self.searches_by_file = counters
+        self.total = snapshot["total"]
+        self.epoch = snapshot.get("epoch", 0)
+        self._counted = snapshot["cursor"]
+        self._snapshot_mtime = mtime
+
+    def _check_snapshot(self):
+        """Start over from the snapshot if another process cleared the log"""
+        try:
+            mtime = os.stat(self._snapshot_path()).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._snapshot_mtime:
+            return
+
+        epoch = self.epoch
+        self._snapshot_mtime = mtime
+        try:
+            with open(self._snapshot_path(), encoding="utf-8") as f:
+                cleared = json.load(f).get("epoch", 0) != epoch
+        except (OSError, ValueError):
+            return
+        if cleared:
+            self._reset_counters()
+            self.tail.clear()
+            self._load_counters()
+
+    # --- reads and writes ---
+
+    def append_many(self, events):
+        """Persist and count a batch of events, returning the new total"""
+        lines = [json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n" for event in events]
+        with self._locked():
+            self._file.write(b"".join(lines))
+            self._file.flush()
+
+            if self._file.tell() >= self.segment_max_bytes:
+                self._rotate()
+
+            self._catch_up()
+            return self.total
+
+    def _scan(self, cursor=None):
+        """Yield (event, cursor after it) from cursor to the current end of the log"""
+        segment, offset = parse_cursor(cursor) if cursor else (self.segments[0], 0)
+        if segment < self.segments[0]:
+            # The cursor's segment was deleted by retention: resume at the oldest one kept
+            segment, offset = self.segments[0], 0
+
+        for current in [s for s in self.segments if s >= segment]:
+            try:
+                f = open(self._segment_path(current), "rb")
+            except OSError:
+                continue
+            with f:
+                f.seek(offset if current == segment else 0)
+                for line in iter(f.readline, b""):
+                    if not line.endswith(b"\n"):
+                        # A write still in progress; stop before it
+                        return
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    yield event, format_cursor(current, f.tell())
+
+    @staticmethod
+    def _matches(event, event_type, session_id):
+        return ((event_type is None or event.get("event_type") == event_type)
+                and (session_id is None or event.get("session_id") == session_id))
+
+    def read(self, cursor=None, limit=100, event_type=None, session_id=None):
+        """Return up to limit events after cursor, the cursor to continue from, and whether more remain"""
+        if cursor:
+            parse_cursor(cursor)
+
+        with self._locked():
+            events = []
+            next_cursor = cursor or format_cursor(self.segments[0], 0)
+            scanned = 0
+
+            for event, position in self._scan(cursor):
+                if len(events) >= limit or scanned >= MAX_SCAN_LINES:
+                    return events, next_cursor, True
+                scanned += 1
+                next_cursor = position
+                if self._matches(event, event_type, session_id):
+                    events.append(event)
+
+            return events, next_cursor, False
+
+    def recent(self, limit=100, event_type=None, session_id=None):
+        """Newest events first, served from the in-memory tail"""
+        with self._locked():
+            self._catch_up()
+            matches = []
+            for event in reversed(self.tail):
+                if self._matches(event, event_type, session_id):
+                    matches.append(event)
+                    if len(matches) >= limit:
+                        break
+            return matches
+
+    def clear(self):
+        with self._locked():
+            next_segment = self.segments[-1] + 1
+            for segment in self.segments:
+                try:
+                    os.remove(self._segment_path(segment))
+                except OSError:
+                    pass
+            self.segments = [next_segment]
+            self._open_segment(next_segment)
+
+            epoch = self.epoch + 1
+            self._reset_counters()
+            self.tail.clear()
+            self.epoch = epoch
+            self._counted = format_cursor(next_segment, 0)
+            self._save_counters()
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._lock_file.close()
+
+    def stats(self):
+        with self._locked():
+            self._catch_up()
+            return {
+                "total_events": self.total,
+                "by_type": dict(self.by_type),
+                "wpm_changes_by_file": dict(self.wpm_changes_by_file),
+                "searches_by_file": dict(self.searches_by_file),
+                "segments": len(self.segments)
+            }
@@ -1,87 +1,293 @@
+import argparse
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
 import cv2
 import mediapipe as mp
-from scipy.spatial import distance as dist
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+
+from blink_inference import EAR_THRESHOLD, calculate_ear, eye_points
 
 # --- CONFIGURATION ---
-EAR_THRESHOLD = 0.20 
 # We keep CONSECUTIVE_FRAMES at 1 for "instant" reading-stop response
-CONSECUTIVE_FRAMES = 1 
+CONSECUTIVE_FRAMES = 1
 
 API_URL = "http://localhost:5001/blink"
 
-LEFT_EYE = [362, 385, 387, 263, 373, 380]
-RIGHT_EYE = [33, 160, 158, 133, 153, 144]
+# Latency samples kept per stage; percentiles cover the most recent ones
+STATS_WINDOW = 10000
 
-def calculate_ear(eye_landmarks):
-    v1 = dist.euclidean(eye_landmarks[1], eye_landmarks[5])
-    v2 = dist.euclidean(eye_landmarks[2], eye_landmarks[4])
-    h = dist.euclidean(eye_landmarks[0], eye_landmarks[3])
-    return (v1 + v2) / (2.0 * h)
+# Extra space kept around the eyes when cropping the next frame to them, in eye-box widths
+ROI_MARGIN = 0.75
 
-# --- INITIALIZATION ---
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(refine_landmarks=True)
 
-# Using Index 1 as confirmed
-cap = cv2.VideoCapture(1, cv2.CAP_AVFOUNDATION)
+def eye_roi(points, frame_width, frame_height):
+    """Crop box (x0, y0, x1, y1) around both eyes with ROI_MARGIN to spare"""
+    x0, y0 = points.reshape(-1, 2).min(axis=0)
+    x1, y1 = points.reshape(-1, 2).max(axis=0)
+    margin = (x1 - x0) * ROI_MARGIN
+    return (max(0, int(x0 - margin)), max(0, int(y0 - margin)),
+            min(frame_width, int(x1 + margin)), min(frame_height, int(y1 + margin)))
 
-blink_counter = 0
-eyes_already_closed = False # To prevent multiple triggers during a single blink
 
-print("Reading Tracker Active. Press 'ESC' to quit.")
+def put_latest(q, item):
+    """Put item on a bounded queue, dropping the stale item already there. Returns True if one was dropped."""
+    dropped = False
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass
 
-def send_blink(state):
-    try:
-        requests.post(API_URL, json={"state": state}, timeout=0.1)
-    except requests.exceptions.RequestException:
-        # This prevents the script from crashing if the server isn't running
-        pass
 
-while cap.isOpened():
-    success, frame = cap.read()
-    if not success: break
+class StageStats:
+    """Latency samples for one pipeline stage, bounded to the last STATS_WINDOW"""
 
-    frame = cv2.flip(frame, 1)
-    h, w, _ = frame.shape
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = face_mesh.process(rgb_frame)
+    def __init__(self, name, window=STATS_WINDOW):
+        self.name = name
+        self.count = 0
+        self.samples = deque(maxlen=window)
 
-    if results.multi_face_landmarks:
-        landmarks = results.multi_face_landmarks[0].landmark
-        coords = [(int(l.x * w), int(l.y * h)) for l in landmarks]
-
-        left_eye_pts = [coords[i] for i in LEFT_EYE]
-        right_eye_pts = [coords[i] for i in RIGHT_EYE]
-        avg_ear = (calculate_ear(left_eye_pts) + calculate_ear(right_eye_pts)) / 2.0
-
-        # --- REVERSED TRIGGER LOGIC ---
-        if avg_ear < EAR_THRESHOLD:
-            if not eyes_already_closed:
-                # TRIGGER INSTANTLY ON CLOSURE
-                blink_counter += 1
-                eyes_already_closed = True 
-                print(f"[ACTION] Eyes Closed! Total Blinks: {blink_counter}")
-                send_blink("closed")
-            
-            status_color = (0, 0, 255) # Red for "Closed"
-            status_text = "EYES CLOSED - READING PAUSED"
+    def add(self, seconds):
+        self.count += 1
+        self.samples.append(seconds)
+
+    def summary(self):
+        if not self.samples:
+            return f"{self.name:>10}: no samples"
+        ms = np.array(self.samples) * 1000
+        return (f"{self.name:>10}: n={self.count} (last {len(ms)}) p50={np.percentile(ms, 50):.2f}ms "
+                f"p95={np.percentile(ms, 95):.2f}ms max={ms.max():.2f}ms")
+
+
+class BlinkSender:
+    """Posts eye states to the server over one keep-alive connection, only on transitions"""
+
+    def __init__(self, url=API_URL, enabled=True, session=None):
+        self.url = url
+        self.enabled = enabled
+        self.session_id = session
+        self.last_sent_state = None
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0))
+
+    def send(self, state):
+        if not self.enabled or state == self.last_sent_state:
+            return
+        try:
+            # sent_at lets the browser measure blink-to-pause latency
+            payload = {"state": state, "sent_at": time.time()}
+            if self.session_id:
+                payload["session"] = self.session_id
+            self.session.post(self.url, json=payload, timeout=0.1)
+            self.last_sent_state = state
+        except requests.exceptions.RequestException:
+            # This prevents the script from crashing if the server isn't running
+            # The state stays unsent, so it is retried on the next frame
+            pass
+
+
+class BlinkPipeline:
+    """Capture, inference and output stages joined by one-slot queues
+
+    Capture and inference run on their own threads; output runs on the calling
+    thread because OpenCV windows must be driven from the main thread. With
+    drop_stale set, a stage that falls behind only ever sees the newest frame.
+    """
+
+    def __init__(self, capture, scale=1.0, use_roi=False, drop_stale=True, sender=None):
+        self.capture = capture
+        self.scale = scale
+        self.use_roi = use_roi
+        self.drop_stale = drop_stale
+        self.sender = sender or BlinkSender()
+
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(refine_landmarks=True)
+        self.frames = queue.Queue(maxsize=1)
+        self.results = queue.Queue(maxsize=1)
+        self.stopped = threading.Event()
+
+        self.captured = 0
+        self.processed = 0
+        self.dropped = 0
+        self.stats = {name: StageStats(name) for name in ("capture", "inference", "end_to_end")}
+
+    def _put(self, q, item):
+        if self.drop_stale:
+            if put_latest(q, item):
+                self.dropped += 1
         else:
-            if eyes_already_closed:
-                # RESET ONLY ONCE EYES RE-OPEN
-                eyes_already_closed = False
-                print("[ACTION] Eyes Re-opened - Resuming...")
-            
-            status_color = (0, 255, 0) # Green for "Open"
-            status_text = "EYES OPEN - READING ACTIVE"
-            send_blink("open")
-
-        # Visual Feedback for the App
-        cv2.putText(frame, status_text, (30, 50), 0, 0.8, status_color, 2)
-        cv2.putText(frame, f"Blinks: {blink_counter}", (30, 90), 0, 0.7, (255, 255, 255), 2)
-
-    cv2.imshow('Reading Assistant - Blink Detection', frame)
-    if cv2.waitKey(1) & 0xFF == 27: break
-
-cap.release()
-cv2.destroyAllWindows()
+            while not self.stopped.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+    def capture_stage(self):
+        while not self.stopped.is_set() and self.capture.isOpened():
+            started = time.perf_counter()
+            success, frame = self.capture.read()
+            if not success:
+                break
+            captured_at = time.perf_counter()
+            self.stats["capture"].add(captured_at - started)
+            self.captured += 1
+            self._put(self.frames, (captured_at, frame))
+        self._put(self.frames, None)
+
+    def infer(self, frame, roi):
+        """Run the face mesh on the frame (or just the eye region) and return eye points in frame pixels"""
+        frame_height, frame_width = frame.shape[:2]
+        x0, y0, x1, y1 = roi or (0, 0, frame_width, frame_height)
+        image = frame[y0:y1, x0:x1]
+
+        if self.scale != 1.0:
+            image = cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+        results = self.face_mesh.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        if not results.multi_face_landmarks:
+            return None
+
+        # Landmarks are normalized to the crop, so scale by the crop's size in frame pixels
+        landmarks = results.multi_face_landmarks[0].landmark
+        return eye_points(landmarks, x1 - x0, y1 - y0, offset=(x0, y0))
+
+    def inference_stage(self):
+        roi = None
+        while not self.stopped.is_set():
+            item = self.frames.get()
+            if item is None:
+                break
+            captured_at, frame = item
+
+            started = time.perf_counter()
+            points = self.infer(frame, roi)
+            if points is None and roi is not None:
+                # Lost the eyes inside the crop: retry on the whole frame
+                roi = None
+                points = self.infer(frame, roi)
+
+            avg_ear = None
+            if points is not None:
+                avg_ear = float(calculate_ear(points).mean())
+                if self.use_roi:
+                    roi = eye_roi(points, frame.shape[1], frame.shape[0])
+
+            self.stats["inference"].add(time.perf_counter() - started)
+            self.processed += 1
+            self._put(self.results, (captured_at, frame, points, avg_ear))
+        self._put(self.results, None)
+
+    def run(self, headless=False):
+        threads = [threading.Thread(target=self.capture_stage, daemon=True),
+                   threading.Thread(target=self.inference_stage, daemon=True)]
+        for thread in threads:
+            thread.start()
+
+        blink_counter = 0
+        closed_frames = 0
+        eyes_already_closed = False # To prevent multiple triggers during a single blink
+        started = time.perf_counter()
+
+        try:
+            while True:
+                item = self.results.get()
+                if item is None:
+                    break
+                captured_at, frame, points, avg_ear = item
+
+                if avg_ear is not None:
+                    # --- REVERSED TRIGGER LOGIC ---
+                    if avg_ear < EAR_THRESHOLD:
+                        closed_frames += 1
+                        if not eyes_already_closed and closed_frames >= CONSECUTIVE_FRAMES:
+                            # TRIGGER INSTANTLY ON CLOSURE
+                            blink_counter += 1
+                            eyes_already_closed = True
+                            print(f"[ACTION] Eyes Closed! Total Blinks: {blink_counter}")
+                            self.sender.send("closed")
+
+                        status_color = (0, 0, 255) # Red for "Closed"
+                        status_text = "EYES CLOSED - READING PAUSED"
+                    else:
+                        closed_frames = 0
+                        if eyes_already_closed:
+                            # RESET ONLY ONCE EYES RE-OPEN
+                            eyes_already_closed = False
+                            print("[ACTION] Eyes Re-opened - Resuming...")
+
+                        status_color = (0, 255, 0) # Green for "Open"
+                        status_text = "EYES OPEN - READING ACTIVE"
+                        self.sender.send("open")
+
+                self.stats["end_to_end"].add(time.perf_counter() - captured_at)
+
+                if headless:
+                    continue
+
+                frame = cv2.flip(frame, 1)
+                if avg_ear is not None:
+                    # Visual Feedback for the App
+                    cv2.putText(frame, status_text, (30, 50), 0, 0.8, status_color, 2)
+                    cv2.putText(frame, f"Blinks: {blink_counter}", (30, 90), 0, 0.7, (255, 255, 255), 2)
+
+                cv2.imshow('Reading Assistant - Blink Detection', frame)
+                if cv2.waitKey(1) & 0xFF == 27: break
+        finally:
+            self.stopped.set()
+            elapsed = time.perf_counter() - started
+            self.capture.release()
+            cv2.destroyAllWindows()
+            self.report(elapsed)
+
+    def report(self, elapsed):
+        print(f"Captured {self.captured} frames, processed {self.processed}, dropped {self.dropped} "
+              f"in {elapsed:.2f}s ({self.processed / elapsed if elapsed else 0:.1f} fps)")
+        for stage in self.stats.values():
+            print(stage.summary())
+
+
+def open_source(source):
+    """Open a camera by index or a recorded video by path"""
+    if source.isdigit():
+        # Using Index 1 as confirmed
+        backend = cv2.CAP_AVFOUNDATION if sys.platform == "darwin" else cv2.CAP_ANY
+        return cv2.VideoCapture(int(source), backend), True
+    return cv2.VideoCapture(source), False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blink detector for the RSVP reader")
+    parser.add_argument("--source", default="1", help="camera index or path to a recorded video")
+    parser.add_argument("--scale", type=float, default=1.0, help="downscale factor applied before inference")
+    parser.add_argument("--roi", action="store_true", help="run inference on a crop around the last seen eyes")
+    parser.add_argument("--headless", action="store_true", help="skip the preview window")
+    parser.add_argument("--no-send", action="store_true", help="do not post states to the server")
+    parser.add_argument("--session", help="reader session to drive (default: readers opened with ?follow=default)")
+    parser.add_argument("--drop-stale", choices=["auto", "yes", "no"], default="auto",
+                        help="drop frames a stage is too slow for (auto: only for live cameras)")
+    args = parser.parse_args()
+
+    capture, is_camera = open_source(args.source)
+    drop_stale = is_camera if args.drop_stale == "auto" else args.drop_stale == "yes"
+
+    pipeline = BlinkPipeline(capture, scale=args.scale, use_roi=args.roi, drop_stale=drop_stale,
+                             sender=BlinkSender(enabled=not args.no_send, session=args.session))
+
+    print("Reading Tracker Active. Press 'ESC' to quit.")
+    pipeline.run(headless=args.headless)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5001")
+workers = int(os.getenv("WEB_CONCURRENCY", min(4, multiprocessing.cpu_count())))
+# Blink and PDF/TTS streams hold a request open, so each worker serves them on threads
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", 32))
+# Streams stay open far longer than a normal request
+timeout = 0
+graceful_timeout = 10
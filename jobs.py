@@ -0,0 +1,278 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app_logging import fields, get_logger
+from sqlite_pool import ConnectionPool
+
+log = get_logger("jobs")
+
+# --- CONFIGURATION ---
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("data", "jobs.db"))
+# Heavy jobs run at once per worker process; the rest wait in that process's queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# Jobs waiting in one process's queue beyond this are refused, so request threads stay free for short calls
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", 16))
+# Unfinished jobs one client may have across all workers
+MAX_JOBS_PER_CLIENT = int(os.getenv("MAX_JOBS_PER_CLIENT", 2))
+# Finished jobs, with their results, stay available for polling this long
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 60 * 60))
+# Progress is written at most this often; a running job sees a cancel made on another worker within it
+PROGRESS_INTERVAL_SECONDS = 0.25
+# Each process re-stamps its unfinished jobs this often; a job not stamped for STALE_SECONDS lost its worker
+HEARTBEAT_SECONDS = 10
+STALE_SECONDS = 60
+
+ACTIVE_STATES = ("queued", "running")
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        client TEXT NOT NULL,
+        owner TEXT NOT NULL,
+        state TEXT NOT NULL,
+        progress REAL NOT NULL DEFAULT 0,
+        detail TEXT,
+        result TEXT,
+        error TEXT,
+        cancel_requested INTEGER NOT NULL DEFAULT 0,
+        version INTEGER NOT NULL DEFAULT 1,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL,
+        updated_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS jobs_client ON jobs (client, state)",
+    "CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)",
+)
+COLUMNS = ("id", "kind", "client", "state", "progress", "detail", "result", "error", "cancel_requested",
+           "version", "created_at", "started_at", "finished_at", "updated_at")
+
+
+class JobRejected(Exception):
+    """The job was not accepted: the queue is full or the client has too many jobs"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function once its job has been cancelled"""
+
+
+class Job:
+    """The running job's handle: report progress, and stop when cancelled"""
+
+    def __init__(self, manager, job_id):
+        self.manager = manager
+        self.id = job_id
+        self.cancelled = threading.Event()
+        self._last_write = 0.0
+
+    def report(self, progress, **detail):
+        """Record progress (0 to 1) and detail; raises JobCancelled once the job is cancelled
+
+        Writes are throttled to PROGRESS_INTERVAL_SECONDS, which is also how
+        often a cancel made through another worker is noticed.
+        """
+        if self.cancelled.is_set():
+            raise JobCancelled()
+        now = time.monotonic()
+        if now - self._last_write < PROGRESS_INTERVAL_SECONDS and progress < 1:
+            return
+        self._last_write = now
+        if self.manager._write_progress(self.id, progress, detail):
+            self.cancelled.set()
+            raise JobCancelled()
+
+
+class JobManager:
+    """Heavy work run on a bounded pool, tracked in a SQLite table every worker shares
+
+    Any worker can answer polls, progress streams and cancels for any job.
+    Jobs run in the process that accepted them.
+    """
+
+    def __init__(self, path=JOB_DB_PATH, workers=JOB_WORKERS, max_queued=MAX_QUEUED_JOBS,
+                 max_per_client=MAX_JOBS_PER_CLIENT):
+        self.pool = ConnectionPool(path)
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_per_client = max_per_client
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self._local = {}  # job id -> Job, for jobs accepted by this process and not finished
+        # Wakes progress streams in this process when a job here changes
+        self.changed = threading.Condition()
+
+        with self.pool.transaction() as db:
+            for statement in SCHEMA:
+                db.execute(statement)
+
+        threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True).start()
+
+    def submit(self, kind, client, fn):
+        """Queue fn(job) to run on the pool and return the job id; its return value is the result
+
+        Raises JobRejected when this process's queue is full or client already
+        has MAX_JOBS_PER_CLIENT unfinished jobs.
+        """
+        with self.lock:
+            if self.queued >= self.max_queued:
+                raise JobRejected("Too many jobs queued; try again shortly", retry_after=5)
+            self.queued += 1
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        try:
+            with self.pool.transaction() as db:
+                (active,) = db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE client = ? AND state IN (?, ?) AND updated_at > ?",
+                    (client, *ACTIVE_STATES, now - STALE_SECONDS)).fetchone()
+                if active >= self.max_per_client:
+                    raise JobRejected(f"At most {self.max_per_client} unfinished jobs per client", retry_after=2)
+                db.execute(
+                    "INSERT INTO jobs (id, kind, client, owner, state, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                    (job_id, kind, client, self.owner, now, now))
+        except BaseException:
+            with self.lock:
+                self.queued -= 1
+            raise
+
+        job = Job(self, job_id)
+        with self.lock:
+            self._local[job_id] = job
+        self.executor.submit(self._run, job, kind, fn)
+        return job_id
+
+    def _update(self, job_id, only_states, **values):
+        """Set columns of an unfinished job (one in only_states) and bump its version; False if it wasn't"""
+        values["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        placeholders = ", ".join("?" for _ in only_states)
+        with self.pool.connection() as db:
+            updated = db.execute(
+                f"UPDATE jobs SET {assignments}, version = version + 1 WHERE id = ? AND state IN ({placeholders})",
+                (*values.values(), job_id, *only_states)).rowcount
+        with self.changed:
+            self.changed.notify_all()
+        return bool(updated)
+
+    def _write_progress(self, job_id, progress, detail):
+        """Store progress; returns True if a cancel was requested meanwhile"""
+        self._update(job_id, ("running",), progress=round(min(1.0, max(0.0, progress)), 4),
+                     detail=json.dumps(detail))
+        with self.pool.connection() as db:
+            row = db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def _run(self, job, kind, fn):
+        with self.lock:
+            self.queued -= 1
+            self.running += 1
+        started = time.perf_counter()
+        try:
+            # A job cancelled while queued has already been marked so; don't start it
+            if not self._update(job.id, ("queued",), state="running", started_at=time.time()):
+                return
+            try:
+                result = fn(job)
+            except JobCancelled:
+                self._update(job.id, ACTIVE_STATES, state="cancelled", finished_at=time.time())
+                log.info("Job cancelled", extra=fields(job_id=job.id, kind=kind))
+            except Exception as e:
+                log.exception("Job failed", extra=fields(job_id=job.id, kind=kind))
+                self._update(job.id, ACTIVE_STATES, state="failed", error=str(e), finished_at=time.time())
+            else:
+                self._update(job.id, ACTIVE_STATES, state="done", progress=1.0, result=json.dumps(result),
+                             finished_at=time.time())
+                log.info("Job done", extra=fields(job_id=job.id, kind=kind,
+                                                  seconds=round(time.perf_counter() - started, 3)))
+        finally:
+            with self.lock:
+                self.running -= 1
+                self._local.pop(job.id, None)
+
+    def get(self, job_id):
+        """The job as a dict, or None if unknown or expired"""
+        with self.pool.connection() as db:
+            row = db.execute(f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(COLUMNS, row))
+        for column in ("detail", "result"):
+            job[column] = json.loads(job[column]) if job[column] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        if job["state"] in ACTIVE_STATES and job["updated_at"] < time.time() - STALE_SECONDS:
+            # Its worker stopped stamping it: it died or was restarted
+            job["state"] = "failed"
+            job["error"] = "The worker running this job stopped"
+        job["job_id"] = job.pop("id")
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns the job as it now stands, or None if unknown"""
+        with self.pool.transaction() as db:
+            row = db.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if row[0] == "queued":
+                db.execute("UPDATE jobs SET state = 'cancelled', finished_at = ?, updated_at = ?, "
+                           "version = version + 1 WHERE id = ?", (now, now, job_id))
+            elif row[0] == "running":
+                db.execute("UPDATE jobs SET cancel_requested = 1, version = version + 1 WHERE id = ?", (job_id,))
+
+        with self.lock:
+            job = self._local.get(job_id)
+        if job is not None:
+            job.cancelled.set()
+        with self.changed:
+            self.changed.notify_all()
+        return self.get(job_id)
+
+    def wait(self, job_id, version, timeout):
+        """The job once its version passes version, or as it stands after timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["version"] != version or job["state"] not in ACTIVE_STATES or remaining <= 0:
+                return job
+            # Local jobs wake this at once; jobs on other workers are seen on the next poll
+            with self.changed:
+                self.changed.wait(timeout=min(remaining, PROGRESS_INTERVAL_SECONDS))
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            now = time.time()
+            try:
+                with self.pool.connection() as db:
+                    db.execute("UPDATE jobs SET updated_at = ? WHERE owner = ? AND state IN (?, ?)",
+                               (now, self.owner, *ACTIVE_STATES))
+                    # Finished jobs past their TTL, and unfinished ones whose worker died as long ago
+                    db.execute("DELETE FROM jobs WHERE finished_at < ? OR (finished_at IS NULL AND updated_at < ?)",
+                               (now - JOB_TTL_SECONDS, now - JOB_TTL_SECONDS))
+            except Exception as e:
+                log.warning("Job heartbeat failed", extra=fields(error=str(e)))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "running": self.running,
+                "max_queued": self.max_queued,
+                "max_per_client": self.max_per_client
+            }
@@ -0,0 +1,142 @@
+import re
+import threading
+from bisect import bisect_left
+
+from langdetect.detector_factory import PROFILES_DIRECTORY, DetectorFactory
+from langdetect.lang_detect_exception import LangDetectException
+
+# --- CONFIGURATION ---
+RTL_LANGUAGES = {'ar', 'he', 'fa', 'ur'}
+# Characters looked at per segment, taken from its middle
+SAMPLE_CHARS = 600
+# Most langdetect runs spent on one document; segments past this fall back to script counts
+MAX_DETECTOR_CALLS = 32
+# Share of RTL letters above (or below 1 - this) which the script alone decides the direction
+SCRIPT_CONFIDENCE = 0.9
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# Hebrew, Arabic, Syriac, Thaana, NKo and the Hebrew/Arabic presentation forms
+RTL_CHARS = re.compile(r"[\u0590-\u08FF\uFB1D-\uFDFF\uFE70-\uFEFF]")
+
+_factory = None
+_factory_lock = threading.Lock()
+
+
+def get_factory():
+    """langdetect profiles, loaded once per process"""
+    global _factory
+    if _factory is None:
+        with _factory_lock:
+            if _factory is None:
+                factory = DetectorFactory()
+                factory.load_profile(PROFILES_DIRECTORY)
+                # Fixed seed so the same sample always gets the same answer
+                factory.set_seed(0)
+                _factory = factory
+    return _factory
+
+
+def sample(text, size=SAMPLE_CHARS):
+    if len(text) <= size:
+        return text
+    start = (len(text) - size) // 2
+    return text[start:start + size]
+
+
+def split_paragraphs(text):
+    """Return the start offsets and texts of the blank-line separated paragraphs"""
+    offsets = [0]
+    paragraphs = []
+    for match in PARAGRAPH_BREAK.finditer(text):
+        paragraphs.append(text[offsets[-1]:match.start()])
+        offsets.append(match.end())
+    paragraphs.append(text[offsets[-1]:])
+    return offsets, paragraphs
+
+
+def detect_language(text):
+    try:
+        detector = get_factory().create()
+        detector.append(text)
+        return detector.detect()
+    except LangDetectException:
+        return None
+
+
+class SegmentDetector:
+    """Direction and language of one document's segments, fed one segment at a time
+
+    Only a bounded sample of each segment is inspected. The script of the
+    sample settles most segments; langdetect is run only on mixed-script
+    samples, and at most MAX_DETECTOR_CALLS times over the whole document,
+    however many calls to detect() it is spread across.
+    """
+
+    def __init__(self, max_calls=MAX_DETECTOR_CALLS):
+        self.max_calls = max_calls
+        self.calls = 0
+
+    def detect(self, text):
+        """Return (direction, language) for a segment; direction is None for one without letters"""
+        snippet = sample(text)
+        letters = sum(1 for ch in snippet if ch.isalpha())
+        if not letters:
+            return None, None
+
+        rtl_share = len(RTL_CHARS.findall(snippet)) / letters
+        if rtl_share >= SCRIPT_CONFIDENCE:
+            return "rtl", None
+        if rtl_share <= 1 - SCRIPT_CONFIDENCE:
+            return "ltr", None
+
+        if self.calls < self.max_calls:
+            self.calls += 1
+            lang = detect_language(snippet)
+            if lang is not None:
+                return ("rtl" if lang in RTL_LANGUAGES else "ltr"), lang
+        return ("rtl" if rtl_share >= 0.5 else "ltr"), None
+
+
+def detect_segments(texts):
+    """Return a (direction, language) pair for each segment of a document"""
+    detector = SegmentDetector()
+    return [detector.detect(text) for text in texts]
+
+
+def build_direction_map(segment_offsets, directions, word_offsets):
+    """Turn per-segment directions into runs keyed by the first word index of each run
+
+    segment_offsets are the character offsets where each segment starts and
+    word_offsets those of each word. Segments without a direction inherit the
+    previous one (or the next one at the start of the document).
+    """
+    fallback = next((d for d in directions if d), "ltr")
+    runs = []
+    current = None
+
+    for offset, direction in zip(segment_offsets, directions):
+        direction = direction or current or fallback
+        if direction == current:
+            continue
+        start_word = bisect_left(word_offsets, offset)
+        if runs and runs[-1]["start_word"] == start_word:
+            # The previous run had no words in it
+            runs.pop()
+            if runs and runs[-1]["direction"] == direction:
+                current = direction
+                continue
+        runs.append({"start_word": start_word, "direction": direction})
+        current = direction
+
+    if runs:
+        runs[0]["start_word"] = 0
+    return runs
+
+
+def document_direction(direction_map, word_count):
+    """The direction covering most words, for callers that want a single value"""
+    counts = {"ltr": 0, "rtl": 0}
+    bounds = [run["start_word"] for run in direction_map] + [word_count]
+    for i, run in enumerate(direction_map):
+        counts[run["direction"]] += bounds[i + 1] - bounds[i]
+    return "rtl" if counts["rtl"] > counts["ltr"] else "ltr"
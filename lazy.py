@@ -0,0 +1,72 @@
+import importlib
+import threading
+import time
+
+from app_logging import fields, get_logger
+from metrics import subsystem_load_seconds
+
+log = get_logger("lazy")
+
+_unset = object()
+
+
+class Lazy:
+    """A subsystem built on first use, once, whichever thread gets there first
+
+    Attribute access is forwarded to the built object, so a Lazy can stand in
+    for a module or store at its call sites. Use resolve() where the object itself
+    is needed (identity checks, None for a subsystem that isn't configured).
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value = _unset
+        self.load_seconds = None
+
+    @classmethod
+    def module(cls, name, after_import=None):
+        """A module imported on first use; after_import(module) runs once, before anyone sees it"""
+        def load():
+            module = importlib.import_module(name)
+            if after_import is not None:
+                after_import(module)
+            return module
+        return cls(name, load)
+
+    @property
+    def loaded(self):
+        return self._value is not _unset
+
+    def resolve(self):
+        value = self._value
+        if value is not _unset:
+            return value
+        with self._lock:
+            if self._value is _unset:
+                started = time.perf_counter()
+                self._value = self._factory()
+                self.load_seconds = time.perf_counter() - started
+                subsystem_load_seconds.set(round(self.load_seconds, 6), self.name)
+                log.info("Loaded subsystem", extra=fields(subsystem=self.name, seconds=round(self.load_seconds, 4)))
+            return self._value
+
+    def __getattr__(self, attribute):
+        # Only called for attributes Lazy itself doesn't have
+        return getattr(self.resolve(), attribute)
+
+
+def warm_up(subsystems):
+    """Load subsystems one by one in a background thread, so the first requests find them ready"""
+    def run():
+        for subsystem in subsystems:
+            try:
+                subsystem.resolve()
+            except Exception:
+                # The request that needs it will load it again and report the error to its caller
+                log.exception("Warm-up failed", extra=fields(subsystem=subsystem.name))
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
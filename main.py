@@ -1,47 +1,120 @@
-from flask import Flask, jsonify, request, send_from_directory
+import time
+
+# Import time is reported at startup, measured from here so it covers Flask and every eager import
+IMPORT_STARTED = time.perf_counter()
+
+from dotenv import load_dotenv
+
+# Before the imports below, whose modules read their configuration from the environment
+load_dotenv()
+
+from flask import Blueprint, Flask, Response, g, jsonify, request, send_from_directory, stream_with_context
 from flask_cors import CORS
+import gzip
 import json
 from datetime import datetime
-import time
-from pypdf import PdfReader
-import io
-from langdetect import detect
 import os
-from elevenlabs import ElevenLabs
-from dotenv import load_dotenv
+import queue
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import closing
+from text_layout import build_layout, calculate_focal_index, tokenize, word_duration_ms
+from doc_cache import DocumentCache, content_key, is_content_key
+import tts
+from event_log import EventLog
+from session_store import DEFAULT_SESSION, create_store
+from search_index import SearchIndex, SearchIndexCache
+from word_store import WordStore
+import metrics
+from metrics import stage_timer
+from app_logging import LOG_SAMPLE_RATE, configure_logging, fields, get_logger
+from lazy import Lazy, warm_up
+from jobs import ACTIVE_STATES, JobManager, JobRejected
+
+log = get_logger("main")
+
+api = Blueprint("api", __name__)
+
+# Load the lazy subsystems in a background thread once the app is created; WARM_UP=0 leaves them to first use
+WARM_UP = os.getenv("WARM_UP", "1") != "0"
 
-load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+def build_tts_pipeline():
+    """The TTS pipeline for the configured synthesizer, or None when there is none"""
+    # TTS_SYNTHESIZER=fake swaps in a local synthesizer for testing without an API key
+    if os.getenv("TTS_SYNTHESIZER") == "fake":
+        return tts.TTSPipeline(tts.FakeSynthesizer())
 
-# Initialize ElevenLabs client
-# OPTION 1: Set your API key directly here for testing
-ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
+    api_key = os.getenv("ELEVENLABS_API_KEY")
+    if not api_key:
+        log.warning("ELEVENLABS_API_KEY not set, TTS will not work")
+        return None
 
-# Check if key is set
-if not ELEVENLABS_API_KEY:
-    print("⚠️  WARNING: ELEVENLABS_API_KEY not set! TTS will not work.")
-    client = None
-else:
-    print(f"✅ ElevenLabs API key loaded: {ELEVENLABS_API_KEY[:5]}***")
-    client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+    # The ElevenLabs SDK is the slowest import here, so only a worker that synthesizes pays for it
+    from elevenlabs import ElevenLabs
+    log.info("ElevenLabs API key loaded", extra=fields(key_prefix=f"{api_key[:5]}***"))
+    return tts.TTSPipeline(tts.ElevenLabsSynthesizer(ElevenLabs(api_key=api_key)))
 
-blink_state = "open"
-current_direction = "ltr"
 
-events = []
+# pypdf, langdetect (and its language profiles) and the ElevenLabs client are
+# loaded on first use, or by the warm-up thread, instead of at import
+pdf_extract = Lazy.module("pdf_extract")
+lang_detect = Lazy.module("lang_detect", after_import=lambda module: module.get_factory())
+tts_pipeline = Lazy("tts", build_tts_pipeline)
+# Server-side blink detection starts its worker processes only when a reader first sends a frame
+# PDF extraction and TTS submitted as background jobs, tracked where every worker can see them
+job_manager = Lazy("jobs", JobManager)
+blink_inference = Lazy.module("blink_inference")
+blink_batcher = Lazy("blink_batcher", lambda: blink_inference.BlinkBatcher())
+blink_frames_supported = Lazy("blink_frames", lambda: blink_inference.frames_supported())
 
-# Create static directory
-os.makedirs('static', exist_ok=True)
+# Blink state, text direction and the like live here, keyed by session, so
+# readers don't share state and several worker processes can serve them
+sessions = Lazy("sessions", create_store)
 
+# Wakes blink streams in this process on a transition; other processes' transitions arrive via watch_blinks()
+blink_changed = threading.Condition()
+# How often each process checks the shared store for transitions made by another worker
+BLINK_POLL_SECONDS = 0.05
+# Let every reader without a detector follow the one posting to the default session
+BLINK_FOLLOW_DEFAULT = os.getenv("BLINK_FOLLOW_DEFAULT") == "1"
+# Seconds between SSE keepalive comments on an idle blink stream
+BLINK_KEEPALIVE_SECONDS = 15
+# Longest a POST /api/blink/frame waits for its batch
+BLINK_FRAME_TIMEOUT_SECONDS = 2
 
-@app.route("/", methods=["GET"])
+event_log = Lazy("event_log", EventLog)
+# Largest batch accepted by POST /api/events
+MAX_EVENT_BATCH = 500
+
+document_cache = Lazy("document_cache", DocumentCache)
+# Substring indexes of recently loaded documents, keyed like the document cache
+search_indexes = SearchIndexCache()
+# Tokenized documents, memory-mapped, for clients that read them in windows
+word_store = Lazy("word_store", WordStore)
+# Most words one /api/documents/<id>/words request may return
+MAX_WORD_WINDOW = 5000
+
+# In the order the warm-up thread loads them: stores first, as every route needs one
+SUBSYSTEMS = (sessions, event_log, document_cache, word_store, job_manager, lang_detect, pdf_extract, tts_pipeline)
+
+
+def session_id():
+    """The caller's session: X-Session-Id header, ?session= or a "session" field in the JSON body"""
+    sid = request.headers.get('X-Session-Id') or request.args.get('session')
+    if not sid and request.is_json:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            sid = body.get('session')
+    return str(sid or DEFAULT_SESSION)[:64]
+
+
+@api.route("/", methods=["GET"])
 def home():
     return jsonify({"message": "Welcome to the backend API!"})
 
 
-@app.route("/api/data", methods=["GET"])
+@api.route("/api/data", methods=["GET"])
 def get_data():
     """Sample API endpoint that returns JSON data"""
     return jsonify({
@@ -53,7 +126,7 @@ def get_data():
     })
 
 
-@app.route("/api/echo", methods=["POST"])
+@api.route("/api/echo", methods=["POST"])
 def echo():
     """Sample endpoint that echoes back posted data"""
     data = request.get_json()
@@ -63,75 +136,392 @@ def echo():
     })
 
 
-@app.route("/api/extract-pdf", methods=["POST"])
+def build_document_entry(pages, page_directions=None):
+    """Everything worth caching about an extracted document"""
+    text = "\n".join(pages)
+
+    if page_directions is None:
+        page_directions = [direction for direction, _ in lang_detect.detect_segments(pages)]
+
+    page_offsets = []
+    position = 0
+    for page in pages:
+        page_offsets.append(position)
+        position += len(page) + 1
+
+    layout = build_layout(text)
+    direction_map = lang_detect.build_direction_map(page_offsets, page_directions, layout["offsets"])
+    return {
+        "text": text,
+        "pages": len(pages),
+        "page_offsets": page_offsets,
+        "direction": lang_detect.document_direction(direction_map, layout["word_count"]),
+        "direction_map": direction_map,
+        "offsets": layout["offsets"],
+        "lengths": layout["lengths"],
+        "focal_indices": layout["focal_indices"]
+    }
+
+
+def build_text_entry(text):
+    """Cache entry for a plain text upload: one page, directions per paragraph"""
+    layout = build_layout(text)
+    offsets, paragraphs = lang_detect.split_paragraphs(text)
+    directions = [direction for direction, _ in lang_detect.detect_segments(paragraphs)]
+    direction_map = lang_detect.build_direction_map(offsets, directions, layout["offsets"])
+    return {
+        "text": text,
+        "pages": 1,
+        "page_offsets": [0],
+        "direction": lang_detect.document_direction(direction_map, layout["word_count"]),
+        "direction_map": direction_map,
+        "offsets": layout["offsets"],
+        "lengths": layout["lengths"],
+        "focal_indices": layout["focal_indices"]
+    }
+
+
+def index_document(key, entry):
+    """Build and keep the search index for a document just extracted"""
+    return search_indexes.put(key, SearchIndex.from_text(entry["text"]))
+
+
+def store_document(key, entry):
+    """Tokenize an extracted document once into the word store and the search index"""
+    words, _ = tokenize(entry["text"])
+    word_store.write(key, words, entry["focal_indices"])
+    search_indexes.put(key, SearchIndex(words))
+
+
+def open_words(document_id):
+    """The stored words of a document, restored from the document cache if this host lost them"""
+    if not is_content_key(document_id):
+        return None
+    document = word_store.open(document_id)
+    if document is None:
+        entry = document_cache.get(document_id)
+        if entry is not None:
+            store_document(document_id, entry)
+            document = word_store.open(document_id)
+    return document
+
+
+def entry_pages(entry):
+    text = entry["text"]
+    bounds = entry["page_offsets"] + [len(text) + 1]
+    return [text[bounds[i]:bounds[i + 1] - 1] for i in range(entry["pages"])]
+
+
+def wants_stream():
+    return (request.args.get('stream') in ('1', 'true')
+            or 'application/x-ndjson' in request.headers.get('Accept', ''))
+
+
+def page_record(number, text, page_count, direction=None):
+    record = {
+        "type": "page",
+        "page": number,
+        "text": text,
+        "focal_indices": [calculate_focal_index(word) for word in tokenize(text)[0]],
+        "progress": round(number / page_count, 4)
+    }
+    if direction:
+        record["direction"] = direction
+    return json.dumps(record) + "\n"
+
+
+def entry_layout(entry):
+    """The cached word layout, in the shape /api/process-text returns it"""
+    return {
+        "word_count": len(entry["offsets"]),
+        "offsets": entry["offsets"],
+        "lengths": entry["lengths"],
+        "focal_indices": entry["focal_indices"]
+    }
+
+
+def wants_layout():
+    """?layout=0 leaves the whole-document layout arrays out, for clients reading in windows"""
+    return request.args.get('layout') not in ('0', 'false')
+
+
+def done_record(key, entry, with_layout=True):
+    record = {
+        "type": "done",
+        "document_id": key,
+        "pages": entry["pages"],
+        "characters": len(entry["text"]),
+        "word_count": len(entry["offsets"]),
+        "direction": entry["direction"],
+        "direction_map": entry["direction_map"]
+    }
+    if with_layout:
+        record.update(entry_layout(entry))
+    return json.dumps(record) + "\n"
+
+
+def stream_pdf(data, file_name, session, with_layout=True):
+    """Yield NDJSON lines: a meta record, one record per page in order, then done"""
+    key = content_key(data)
+    entry = document_cache.get(key)
+    if entry is not None:
+        sessions.set(session, "direction", entry["direction"])
+        yield json.dumps({"type": "meta", "file_name": file_name, "pages": entry["pages"], "cached": True}) + "\n"
+        for number, text in enumerate(entry_pages(entry), start=1):
+            yield page_record(number, text, entry["pages"])
+        yield done_record(key, entry, with_layout)
+        return
+
+    try:
+        with stage_timer("pdf_count_pages"):
+            page_count = pdf_extract.count_pages(data)
+    except Exception as e:
+        log.warning("Failed to read PDF", extra=fields(file_name=file_name, error=str(e)))
+        yield json.dumps({"type": "error", "message": f"Failed to read PDF: {str(e)}"}) + "\n"
+        return
+
+    yield json.dumps({"type": "meta", "file_name": file_name, "pages": page_count, "cached": False}) + "\n"
+
+    pages = []
+    directions = []
+    # One detector for the whole document so its langdetect budget spans every page
+    detector = lang_detect.SegmentDetector()
+    try:
+        for number, text in pdf_extract.iter_pages(data, page_count):
+            with stage_timer("lang_detect"):
+                direction, _ = detector.detect(text)
+            pages.append(text)
+            directions.append(direction)
+            yield page_record(number, text, page_count, direction)
+    except Exception as e:
+        log.warning("Failed to read PDF", extra=fields(file_name=file_name, error=str(e)))
+        yield json.dumps({"type": "error", "message": f"Failed to read PDF: {str(e)}"}) + "\n"
+        return
+
+    with stage_timer("pdf_build_entry"):
+        entry = build_document_entry(pages, directions)
+    document_cache.put(key, entry)
+    with stage_timer("store_document"):
+        store_document(key, entry)
+    sessions.set(session, "direction", entry["direction"])
+    log.info("Streamed PDF", extra=fields(file_name=file_name, characters=len(entry["text"]), pages=page_count))
+
+    yield done_record(key, entry, with_layout)
+
+
+def read_pdf_upload():
+    """(file name, bytes) of the uploaded PDF; ValueError says what is wrong with the upload"""
+    if 'file' not in request.files:
+        raise ValueError("No file provided")
+    file = request.files['file']
+    if file.filename == '':
+        raise ValueError("No file selected")
+    if not file.filename.endswith('.pdf'):
+        raise ValueError("File is not a PDF")
+    return file.filename, file.read()
+
+
+@api.route("/api/extract-pdf", methods=["POST"])
 def extract_pdf():
-    global current_direction
-    """Extract text from uploaded PDF file"""
-    print("📄 /api/extract-pdf endpoint called", flush=True)
-    
+    """Extract text from uploaded PDF file
+
+    With ?stream=1 (or Accept: application/x-ndjson) pages are streamed back
+    as NDJSON in page order while later pages are still being extracted.
+    ?text=0 and ?layout=0 leave out the whole-document text and layout arrays.
+    """
     try:
-        if 'file' not in request.files:
-            return jsonify({
-                "status": "error",
-                "message": "No file provided"
-            }), 400
-        
-        file = request.files['file']
-        
-        if file.filename == '':
-            return jsonify({
-                "status": "error",
-                "message": "No file selected"
-            }), 400
-        
-        if not file.filename.endswith('.pdf'):
+        try:
+            file_name, data = read_pdf_upload()
+        except ValueError as e:
             return jsonify({
                 "status": "error",
-                "message": "File is not a PDF"
+                "message": str(e)
             }), 400
-        
+
+        if wants_stream():
+            return Response(
+                stream_with_context(stream_pdf(data, file_name, session_id(), wants_layout())),
+                mimetype="application/x-ndjson"
+            )
+
         try:
-            pdf_reader = PdfReader(io.BytesIO(file.read()))
-            text = ""
-            
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-
-            try:
-                lang = detect(text)
-                current_direction = "rtl" if lang in ['ar', 'he', 'fa', 'ur'] else "ltr"
-            except:
-                current_direction = "ltr"
-            
-            print(f"📄 Extracted {len(text)} characters from PDF", flush=True)
+            key = content_key(data)
+            entry = document_cache.get(key)
+            cached = entry is not None
+
+            if not cached:
+                with stage_timer("pdf_extract_pages"):
+                    pages = pdf_extract.extract_pages(data)
+                with stage_timer("pdf_build_entry"):
+                    entry = build_document_entry(pages)
+                document_cache.put(key, entry)
+                with stage_timer("store_document"):
+                    store_document(key, entry)
+
+            sessions.set(session_id(), "direction", entry["direction"])
+
+            log.info("Extracted PDF", extra=fields(
+                file_name=file_name, characters=len(entry["text"]), pages=entry["pages"], cached=cached))
             
-            return jsonify({
+            result = {
                 "status": "success",
-                "text": text,
-                "direction": current_direction,
-                "file_name": file.filename,
-                "pages": len(pdf_reader.pages)
-            }), 200
+                "document_id": key,
+                "direction": entry["direction"],
+                "direction_map": entry["direction_map"],
+                "file_name": file_name,
+                "pages": entry["pages"],
+                "word_count": len(entry["offsets"]),
+                "cached": cached
+            }
+            # Windowed clients skip the text and layout and read /api/documents/<id>/words instead
+            if request.args.get('text') not in ('0', 'false'):
+                result["text"] = entry["text"]
+            if wants_layout():
+                result.update(entry_layout(entry))
+            return jsonify(result), 200
         
         except Exception as e:
-            print(f"Error reading PDF: {str(e)}", flush=True)
+            log.warning("Failed to read PDF", extra=fields(file_name=file_name, error=str(e)))
             return jsonify({
                 "status": "error",
                 "message": f"Failed to read PDF: {str(e)}"
             }), 400
     
     except Exception as e:
-        print(f"Error in extract_pdf: {str(e)}", flush=True)
+        log.exception("Error in extract_pdf")
         return jsonify({
             "status": "error",
             "message": str(e)
         }), 400
 
 
-@app.route("/api/process-word", methods=["POST"])
+def compressible(body, mimetype):
+    """Response for body, gzipped when the client accepts it and it is worth it"""
+    response = Response(body, mimetype=mimetype)
+    response.headers["Vary"] = "Accept-Encoding"
+    if len(body) > 1024 and "gzip" in request.headers.get("Accept-Encoding", ""):
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+@api.route("/api/documents/<document_id>", methods=["GET"])
+def get_document(document_id):
+    """Size and direction runs of a stored document; its words come from /words"""
+    document = open_words(document_id)
+    entry = document_cache.get(document_id) if document is not None else None
+    if entry is None:
+        return jsonify({
+            "status": "error",
+            "message": "Unknown document"
+        }), 404
+
+    return jsonify({
+        "status": "success",
+        "document_id": document_id,
+        "word_count": document.word_count,
+        "pages": entry["pages"],
+        "direction": entry["direction"],
+        "direction_map": entry["direction_map"]
+    })
+
+
+@api.route("/api/documents/<document_id>/words", methods=["GET"])
+def get_document_words(document_id):
+    """A window of a stored document's words and focal letters: ?start=&count=
+
+    JSON by default; ?format=binary returns the word store's compact wire
+    format (see word_store.WINDOW_HEADER). Both are gzipped on request.
+    """
+    try:
+        start = max(0, int(request.args.get('start', 0)))
+        count = min(MAX_WORD_WINDOW, max(0, int(request.args.get('count', 500))))
+    except ValueError:
+        return jsonify({
+            "status": "error",
+            "message": "Invalid start or count"
+        }), 400
+
+    document = open_words(document_id)
+    if document is None:
+        return jsonify({
+            "status": "error",
+            "message": "Unknown document"
+        }), 404
+
+    if request.args.get('format') == 'binary':
+        return compressible(document.window_bytes(start, count), "application/octet-stream")
+
+    start, words, focal_indices = document.window(start, count)
+    body = json.dumps({
+        "status": "success",
+        "start": start,
+        "word_count": document.word_count,
+        "words": words,
+        "focal_indices": focal_indices
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return compressible(body, "application/json")
+
+
+@api.route("/api/documents/<document_id>/search", methods=["GET"])
+def search_document(document_id):
+    """Next word containing ?q= after word position ?after=, wrapping around, plus the match count"""
+    term = request.args.get('q', '').strip().lower()
+    if not term or any(ch.isspace() for ch in term):
+        return jsonify({
+            "status": "error",
+            "message": "Search for exactly one word"
+        }), 400
+
+    try:
+        after = int(request.args.get('after', -1))
+    except ValueError:
+        return jsonify({
+            "status": "error",
+            "message": "Invalid position"
+        }), 400
+
+    index = search_indexes.get(document_id)
+    if index is None and is_content_key(document_id):
+        # Extracted by another worker or before a restart: rebuild from the cached text
+        entry = document_cache.get(document_id)
+        if entry is not None:
+            index = index_document(document_id, entry)
+    if index is None:
+        return jsonify({
+            "status": "error",
+            "message": "Unknown document"
+        }), 404
+
+    position, count, wrapped = index.find_next(term, after)
+    return jsonify({
+        "status": "success",
+        "term": term,
+        "position": position,
+        "count": count,
+        "wrapped": wrapped,
+        "word_count": index.word_count
+    })
+
+
+@api.route("/api/cache/stats", methods=["GET"])
+def get_cache_stats():
+    """Hit/miss counters and size of the extracted document cache"""
+    return jsonify({
+        "status": "success",
+        "cache": document_cache.stats()
+    })
+
+
+@api.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Request and stage metrics of this worker, in the Prometheus text format"""
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@api.route("/api/process-word", methods=["POST"])
 def process_word():
     """Process a word and partition it around focal letter"""
-    print("🔍 /api/process-word endpoint called", flush=True)
     try:
         data = request.get_json()
         word = data.get('word', '')
@@ -148,7 +538,7 @@ def process_word():
         focal = word[focal_index]
         after = word[focal_index + 1:]
         
-        print(f"Word: '{word}' | Before: '{before}' | Focal: '{focal}' | After: '{after}'", flush=True)
+        log.info("Processed word", extra=fields(LOG_SAMPLE_RATE, word=word, focal_index=focal_index))
 
         return jsonify({
             "status": "success",
@@ -159,126 +549,426 @@ def process_word():
             "focal_index": focal_index
         }), 200
     except Exception as e:
-        print(f"Error processing word: {str(e)}", flush=True)
+        log.warning("Error processing word", extra=fields(error=str(e)))
         return jsonify({
             "status": "error",
             "message": str(e)
         }), 400
 
 
-def calculate_focal_index(word):
-    """Calculate which letter should be focal"""
-    if len(word) <= 2:
-        return len(word) // 2
-    
-    min_middle = max(1, len(word) // 3)
-    max_middle = min(len(word) - 2, (len(word) * 2) // 3)
-    
-    import random
-    return random.randint(min_middle, max_middle)
+@api.route("/api/process-text", methods=["POST"])
+def process_text():
+    """Partition a whole document around focal letters in one call
 
+    Pass "directions": true to also get a per-paragraph direction_map.
+    """
+    try:
+        data = request.get_json()
+        text = data.get('text', '')
+        wpm = data.get('wpm')
 
-@app.route("/api/generate-tts", methods=["POST"])
-def generate_tts():
-    """Generate TTS audio with word-level timestamps"""
-    print("🎙️ /api/generate-tts endpoint called", flush=True)
-    
-    data = request.get_json()
+        if not text:
+            return jsonify({
+                "status": "error",
+                "message": "No text provided"
+            }), 400
+
+        if wpm is not None:
+            wpm = int(wpm)
+            if wpm <= 0:
+                return jsonify({
+                    "status": "error",
+                    "message": "wpm must be positive"
+                }), 400
+
+        # Plain text documents are cached and indexed like PDFs, keyed by their UTF-8 bytes
+        key = content_key(text.encode("utf-8"))
+        entry = document_cache.get(key)
+        if entry is None:
+            entry = build_text_entry(text)
+            document_cache.put(key, entry)
+            store_document(key, entry)
+
+        layout = {"document_id": key, **entry_layout(entry)}
+        if wpm is not None:
+            words, _ = tokenize(text)
+            layout["wpm"] = wpm
+            layout["durations_ms"] = [word_duration_ms(word, wpm) for word in words]
+        if data.get('directions'):
+            # Opt-in: PDFs already get their direction map from extraction
+            layout["direction_map"] = entry["direction_map"]
+        log.info("Laid out text", extra=fields(document_id=key, word_count=layout["word_count"]))
+
+        return jsonify({
+            "status": "success",
+            **layout
+        }), 200
+    except Exception as e:
+        log.warning("Error processing text", extra=fields(error=str(e)))
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+
+def tts_request(data):
+    """(text, wpm) of a TTS request; ValueError says what is wrong with it"""
+    data = data if isinstance(data, dict) else {}
     text = data.get('text', '')
-    user_wpm = data.get('wpm', 300)
-    
+
+    # Clients reading a stored document in windows name it instead of sending the text
+    document_id = data.get('document_id')
+    if not text and document_id and is_content_key(str(document_id)):
+        entry = document_cache.get(document_id)
+        text = entry["text"] if entry is not None else ''
+
     if not text:
+        raise ValueError("No text provided")
+
+    try:
+        wpm = float(data.get('wpm', 300))
+    except (TypeError, ValueError):
+        wpm = 0
+    if wpm <= 0:
+        raise ValueError("wpm must be positive")
+    return text, wpm
+
+
+def start_tts(pipeline, text, wpm):
+    """Submit text's chunks for synthesis; returns (run id, the response describing the run)"""
+    # Calculate speaking rate based on WPM
+    # 150 WPM ≈ 1.0 speed, 300 WPM ≈ 2.0 speed
+    speaking_rate = max(0.5, min(4.0, wpm / 150))
+
+    # Split text into words for alignment
+    words = text.split()
+
+    run_id, chunk_keys = pipeline.start(text)
+
+    # Create synthetic alignment data based on WPM
+    # This is a fallback since we don't have real timestamps
+    alignment = tts.synthetic_alignment(words, wpm)
+
+    log.info("Started TTS run", extra=fields(
+        run_id=run_id, chunks=len(chunk_keys), characters=len(text), words=len(words),
+        wpm=wpm, speaking_rate=speaking_rate))
+
+    return run_id, {
+        "audio_url": f"/api/tts/{run_id}.mp3",
+        "segments": [f"/static/tts/{key}.mp3" for key in chunk_keys],
+        "alignment": alignment
+    }
+
+
+TTS_NOT_CONFIGURED = "ElevenLabs API key not configured. Please set ELEVENLABS_API_KEY environment variable or update main.py"
+
+
+@api.route("/api/generate-tts", methods=["POST"])
+def generate_tts():
+    """Generate TTS audio with word-level timestamps"""
+    try:
+        text, user_wpm = tts_request(request.get_json(silent=True))
+    except ValueError as e:
         return jsonify({
             "status": "error",
-            "error": "No text provided"
+            "error": str(e)
         }), 400
-    
-    # Check if client is initialized
-    if client is None:
-        print("❌ ElevenLabs client not initialized - API key missing!", flush=True)
+
+    # Check if a synthesizer is configured
+    pipeline = tts_pipeline.resolve()
+    if pipeline is None:
+        log.error("TTS requested but no synthesizer is configured")
         return jsonify({
             "status": "error",
-            "error": "ElevenLabs API key not configured. Please set ELEVENLABS_API_KEY environment variable or update main.py"
+            "error": TTS_NOT_CONFIGURED
         }), 500
-    
-    # Calculate speaking rate based on WPM
-    # 150 WPM ≈ 1.0 speed, 300 WPM ≈ 2.0 speed
-    speaking_rate = max(0.5, min(4.0, user_wpm / 150))
-    
+
     try:
-        print(f"Generating TTS at {speaking_rate}x speed for {user_wpm} WPM", flush=True)
-        print(f"Text length: {len(text)} characters, {len(text.split())} words", flush=True)
-        
-        # Split text into words for alignment
-        words = text.split()
-        
-        # Generate audio using ElevenLabs - correct method for newer SDK
-        audio_generator = client.text_to_speech.convert(
-            text=text,
-            voice_id="pqHfZKP75CvOlQylNhV4",  # Bill voice ID
-            model_id="eleven_turbo_v2_5"
-        )
-        
-        # Collect audio bytes
-        audio_bytes = b""
-        for chunk in audio_generator:
-            audio_bytes += chunk
-        
-        # Save audio file
-        audio_path = "static/speech.mp3"
-        with open(audio_path, "wb") as f:
-            f.write(audio_bytes)
-        
-        print(f"✅ Audio saved to {audio_path} ({len(audio_bytes)} bytes)", flush=True)
-        
-        # Create synthetic alignment data based on WPM
-        # This is a fallback since we don't have real timestamps
-        ms_per_word = (60 / user_wpm) * 1000
-        alignment = []
-        current_time = 0
-        
-        for word in words:
-            # Adjust duration based on word length
-            word_duration = ms_per_word * (1 + (len(word) - 5) * 0.05)
-            alignment.append({
-                "word": word,
-                "start_time_ms": current_time,
-                "end_time_ms": current_time + word_duration
-            })
-            current_time += word_duration
-        
-        print(f"✅ Created {len(alignment)} synthetic alignments", flush=True)
-        
+        # Synthesize sentence chunks concurrently; wait only for the first so errors still surface here
+        run_id, result = start_tts(pipeline, text, user_wpm)
+        pipeline.wait_first(run_id)
+
         return jsonify({
             "status": "success",
-            "audio_url": "/static/speech.mp3",
-            "alignment": alignment
+            **result
         }), 200
-    
+
     except Exception as e:
-        print(f"❌ TTS Error: {str(e)}", flush=True)
-        import traceback
-        traceback.print_exc()
+        log.exception("TTS error")
         return jsonify({
             "status": "error",
             "error": str(e)
         }), 500
 
 
-@app.route("/api/event", methods=["POST"])
+@api.route("/api/tts/stats", methods=["GET"])
+def get_tts_stats():
+    """Chunk cache hits/misses and synthesis in flight in this worker"""
+    pipeline = tts_pipeline.resolve()
+    if pipeline is None:
+        return jsonify({
+            "status": "error",
+            "error": "TTS is not configured"
+        }), 404
+
+    return jsonify({
+        "status": "success",
+        "tts": pipeline.stats()
+    })
+
+
+@api.route("/api/tts/<run_id>.mp3", methods=["GET"])
+def stream_tts(run_id):
+    """Stream a TTS run's audio, chunk by chunk as synthesis finishes"""
+    pipeline = tts_pipeline.resolve()
+    if pipeline is None or not pipeline.has_run(run_id):
+        return jsonify({
+            "status": "error",
+            "error": "Unknown TTS run"
+        }), 404
+
+    return Response(
+        stream_with_context(pipeline.iter_audio(run_id)),
+        mimetype="audio/mpeg"
+    )
+
+
+def client_id():
+    """Who per-client job limits count against: the session, else the caller's address"""
+    session = session_id()
+    return session if session != DEFAULT_SESSION else f"addr:{request.remote_addr}"
+
+
+def pdf_job(data, file_name, session):
+    """Job function extracting an uploaded PDF, reporting progress page by page"""
+    def run(job):
+        key = content_key(data)
+        entry = document_cache.get(key)
+        cached = entry is not None
+
+        if not cached:
+            with stage_timer("pdf_count_pages"):
+                page_count = pdf_extract.count_pages(data)
+            job.report(0, pages_done=0, pages=page_count)
+
+            pages = []
+            directions = []
+            detector = lang_detect.SegmentDetector()
+            # Closing the page iterator on a cancel cancels the page ranges not yet extracted
+            with closing(pdf_extract.iter_pages(data, page_count)) as extracted:
+                for number, text in extracted:
+                    with stage_timer("lang_detect"):
+                        direction, _ = detector.detect(text)
+                    pages.append(text)
+                    directions.append(direction)
+                    job.report(number / max(1, page_count), pages_done=number, pages=page_count)
+
+            with stage_timer("pdf_build_entry"):
+                entry = build_document_entry(pages, directions)
+            document_cache.put(key, entry)
+            with stage_timer("store_document"):
+                store_document(key, entry)
+
+        sessions.set(session, "direction", entry["direction"])
+        # The text and layout stay out of the job row; the reader windows them from /api/documents/<id>/words
+        return {
+            "document_id": key,
+            "file_name": file_name,
+            "pages": entry["pages"],
+            "word_count": len(entry["offsets"]),
+            "direction": entry["direction"],
+            "direction_map": entry["direction_map"],
+            "cached": cached
+        }
+    return run
+
+
+def tts_job(pipeline, text, wpm):
+    """Job function synthesizing text, reporting progress chunk by chunk
+
+    The audio URL is in the progress detail from the start, so a reader can
+    begin playing before the job is done.
+    """
+    def run(job):
+        run_id, result = start_tts(pipeline, text, wpm)
+        job.report(0, chunks_done=0, audio_url=result["audio_url"])
+        for done, total in pipeline.iter_ready(run_id):
+            job.report(done / total, chunks_done=done, chunks=total, audio_url=result["audio_url"])
+        return result
+    return run
+
+
+def submit_job(kind, fn):
+    """202 with the job's URLs, or 429 when the queue or the client's job limit is full"""
+    try:
+        job_id = job_manager.submit(kind, client_id(), fn)
+    except JobRejected as e:
+        response = jsonify({
+            "status": "error",
+            "message": str(e)
+        })
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+
+    response = jsonify({
+        "status": "accepted",
+        "job_id": job_id,
+        "status_url": f"/api/jobs/{job_id}",
+        "events_url": f"/api/jobs/{job_id}/events"
+    })
+    response.headers["Location"] = f"/api/jobs/{job_id}"
+    return response, 202
+
+
+@api.route("/api/jobs/extract-pdf", methods=["POST"])
+def submit_pdf_job():
+    """Extract an uploaded PDF in the background; poll or stream the job for progress and the result"""
+    try:
+        file_name, data = read_pdf_upload()
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+    return submit_job("extract-pdf", pdf_job(data, file_name, session_id()))
+
+
+@api.route("/api/jobs/generate-tts", methods=["POST"])
+def submit_tts_job():
+    """Synthesize speech in the background; takes the same body as /api/generate-tts"""
+    try:
+        text, wpm = tts_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    pipeline = tts_pipeline.resolve()
+    if pipeline is None:
+        return jsonify({
+            "status": "error",
+            "message": TTS_NOT_CONFIGURED
+        }), 500
+    return submit_job("generate-tts", tts_job(pipeline, text, wpm))
+
+
+@api.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """State (queued, running, done, failed, cancelled), progress, detail and, once done, the result"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "Unknown job"
+        }), 404
+    return jsonify({
+        "status": "success",
+        **job
+    })
+
+
+@api.route("/api/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    """Cancel a job; a running one stops at its next progress report"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "Unknown job"
+        }), 404
+    return jsonify({
+        "status": "success",
+        **job
+    })
+
+
+def job_events(job_id):
+    """Yield an SSE message per job change until the job finishes"""
+    version = None
+    while True:
+        job = job_manager.wait(job_id, version, timeout=BLINK_KEEPALIVE_SECONDS)
+        if job is None:
+            yield "event: error\ndata: {\"message\": \"Unknown job\"}\n\n"
+            return
+        if job["version"] == version and job["state"] in ACTIVE_STATES:
+            # Comments keep proxies from closing an idle stream
+            yield ": keepalive\n\n"
+            continue
+        version = job["version"]
+        yield f"data: {json.dumps(job)}\n\n"
+        if job["state"] not in ACTIVE_STATES:
+            return
+
+
+@api.route("/api/jobs/<job_id>/events", methods=["GET"])
+def stream_job(job_id):
+    """Server-sent events with the job's state on every change, ending once it finishes"""
+    return Response(
+        stream_with_context(job_events(job_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@api.route("/api/jobs/stats", methods=["GET"])
+def get_job_stats():
+    """Jobs queued and running in this worker, and its limits"""
+    return jsonify({
+        "status": "success",
+        "jobs": job_manager.stats()
+    })
+
+
+def validate_event(data):
+    if not isinstance(data, dict) or not data.get('event_type'):
+        raise ValueError("Each event needs an event_type")
+    data['timestamp'] = datetime.now().isoformat()
+    data['session_id'] = session_id()
+    return data
+
+
+@api.route("/api/event", methods=["POST"])
 def log_event():
     """Log user events from the frontend"""
     try:
-        data = request.get_json()
-        data['timestamp'] = datetime.now().isoformat()
-        events.append(data)
-        
-        print(f"Event logged: {data['event_type']}")
-        
+        data = validate_event(request.get_json())
+        total = event_log.append_many([data])
+
+        log.info("Event logged", extra=fields(LOG_SAMPLE_RATE, event_type=data['event_type']))
+
         return jsonify({
             "status": "success",
             "message": f"Event '{data['event_type']}' recorded",
-            "total_events": len(events)
+            "total_events": total
+        }), 201
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+
+@api.route("/api/events", methods=["POST"])
+def log_events():
+    """Log a batch of user events, as {"events": [...]} or a bare list"""
+    try:
+        data = request.get_json()
+        batch = data.get('events') if isinstance(data, dict) else data
+        if not isinstance(batch, list) or not batch:
+            raise ValueError("No events provided")
+        if len(batch) > MAX_EVENT_BATCH:
+            raise ValueError(f"At most {MAX_EVENT_BATCH} events per batch")
+
+        batch = [validate_event(event) for event in batch]
+        total = event_log.append_many(batch)
+
+        log.info("Logged events", extra=fields(LOG_SAMPLE_RATE, count=len(batch)))
+
+        return jsonify({
+            "status": "success",
+            "message": f"{len(batch)} events recorded",
+            "total_events": total
         }), 201
     except Exception as e:
         return jsonify({
@@ -287,41 +977,353 @@ def log_event():
         }), 400
 
 
-@app.route("/api/events", methods=["GET"])
+@api.route("/api/events", methods=["GET"])
 def get_events():
-    """Retrieve all logged events"""
+    """Page through logged events, oldest first
+
+    Pass the returned next_cursor back as ?cursor= to continue; filter with ?event_type=.
+    """
+    try:
+        limit = min(1000, max(1, int(request.args.get('limit', 100))))
+        events, next_cursor, has_more = event_log.read(
+            cursor=request.args.get('cursor'),
+            limit=limit,
+            event_type=request.args.get('event_type'),
+            session_id=request.args.get('session_id')
+        )
+    except ValueError:
+        return jsonify({
+            "status": "error",
+            "message": "Invalid cursor or limit"
+        }), 400
+
+    return jsonify({
+        "status": "success",
+        "total_events": event_log.stats()["total_events"],
+        "events": events,
+        "next_cursor": next_cursor,
+        "has_more": has_more
+    })
+
+
+@api.route("/api/events/recent", methods=["GET"])
+def get_recent_events():
+    """Newest events first, from the in-memory tail of the log"""
+    try:
+        limit = min(1000, max(1, int(request.args.get('limit', 100))))
+    except ValueError:
+        return jsonify({
+            "status": "error",
+            "message": "Invalid limit"
+        }), 400
+
     return jsonify({
         "status": "success",
-        "total_events": len(events),
-        "events": events
+        "events": event_log.recent(limit, request.args.get('event_type'), request.args.get('session_id'))
     })
 
 
-@app.route("/api/events", methods=["DELETE"])
+@api.route("/api/events/stats", methods=["GET"])
+def get_event_stats():
+    """Running aggregates over every logged event"""
+    return jsonify({
+        "status": "success",
+        **event_log.stats()
+    })
+
+
+@api.route("/api/events", methods=["DELETE"])
 def clear_events():
     """Clear all logged events"""
-    global events
-    events = []
+    event_log.clear()
     return jsonify({
         "status": "success",
         "message": "All events cleared"
     })
 
 
-@app.route("/blink", methods=["POST"])
+def record_blink(session, state, sent_at=None):
+    """Store a detector's eye state for session, waking the blink streams if it changed"""
+    # State and the detector clock time of the transition (echoed to clients to measure latency)
+    # are one value, written only when the state differs, in a single transaction
+    blink = {"state": state, "sent_at": sent_at}
+    changed, _ = sessions.set(session, "blink", blink, only_if_changed=True, compare_key="state")
+
+    if changed:
+        with blink_changed:
+            blink_changed.notify_all()
+    return changed
+
+
+@api.route("/blink", methods=["POST"])
 def update_blink():
-    global blink_state
-    blink_state = request.json["state"]
-    return jsonify({"status": "ok"})
+    changed = record_blink(session_id(), request.json["state"], request.json.get("sent_at"))
+    return jsonify({"status": "ok", "changed": changed})
+
+
+@api.route("/api/blink/frame", methods=["POST"])
+def ingest_blink_frame():
+    """Detect the eye state server-side, for readers without a local detector
+
+    Send JSON {"points": [[x, y], ...]} with the 12 eye landmarks a browser
+    face mesh found (left eye then right, in blink_inference.EYE_INDICES order),
+    or a downscaled JPEG/PNG webcam frame as the request body. Frames from every
+    session are micro-batched onto a process pool; a transition is recorded for
+    the session like a POST to /blink.
+    """
+    try:
+        batcher = blink_batcher.resolve()
+    except ImportError:
+        return jsonify({
+            "status": "error",
+            "message": "Server-side blink detection needs numpy (pip install .[blink])"
+        }), 501
+
+    frame = points = None
+    sent_at = None
+    if request.mimetype in ("image/jpeg", "image/png"):
+        if not blink_frames_supported.resolve():
+            return jsonify({
+                "status": "error",
+                "message": "Frames need OpenCV and MediaPipe on the server; send eye points instead"
+            }), 501
+        frame = request.get_data()
+        sent_at = request.args.get('sent_at', type=float)
+        if not frame:
+            return jsonify({
+                "status": "error",
+                "message": "Empty frame"
+            }), 400
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({
+                "status": "error",
+                "message": "Send eye points as JSON or a JPEG/PNG frame"
+            }), 400
+        try:
+            points = blink_inference.parse_points(data.get('points'))
+        except ValueError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400
+        sent_at = data.get('sent_at')
+
+    try:
+        result = batcher.submit(points=points, frame=frame).result(timeout=BLINK_FRAME_TIMEOUT_SECONDS)
+    except queue.Full:
+        response = jsonify({
+            "status": "error",
+            "message": "Too many frames waiting; drop this one and send the next"
+        })
+        response.headers["Retry-After"] = "1"
+        return response, 429
+    except FutureTimeout:
+        return jsonify({
+            "status": "error",
+            "message": "Blink detection timed out"
+        }), 504
+    except Exception as e:
+        log.exception("Blink detection failed")
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+    metrics.blink_batch_size.observe(result["batch_size"])
+    changed = False
+    if result["state"] != "unknown":
+        changed = record_blink(session_id(), result["state"], sent_at)
+
+    return jsonify({
+        "status": "success",
+        "changed": changed,
+        **result
+    })
+
+
+@api.route("/api/blink/stats", methods=["GET"])
+def get_blink_stats():
+    """Frames, batch sizes, per-frame latency and per-core throughput of server-side detection here"""
+    if not blink_batcher.loaded:
+        return jsonify({
+            "status": "success",
+            "blink": {"frames": 0}
+        })
+    return jsonify({
+        "status": "success",
+        "blink": blink_batcher.stats()
+    })
+
+
+def follows_default():
+    """Whether a reader without a detector of its own should follow the default session's
+
+    Opt-in per request with ?follow=default, or for every reader with BLINK_FOLLOW_DEFAULT=1.
+    """
+    return request.args.get('follow') == DEFAULT_SESSION or BLINK_FOLLOW_DEFAULT
+
 
+def current_blink(session, follow_default=False):
+    """Return (source session, version, state, sent_at) for the blink channel a reader follows
 
-@app.route("/blink_state", methods=["GET"])
+    A session no detector has posted to reads as "open", unless follow_default
+    is set, in which case it follows the detector posting to the default session.
+    """
+    blink, version = sessions.get_versioned(session, "blink")
+    if not version and follow_default and session != DEFAULT_SESSION:
+        session = DEFAULT_SESSION
+        blink, version = sessions.get_versioned(session, "blink")
+    blink = blink or {}
+    return session, version, blink.get("state", "open"), blink.get("sent_at")
+
+
+@api.route("/blink_state", methods=["GET"])
 def get_blink_state():
-    return jsonify({"state": blink_state})
+    _, _, state, _ = current_blink(session_id(), follows_default())
+    return jsonify({"state": state})
+
+
+@api.route("/api/session", methods=["GET"])
+def get_session():
+    """State held for the caller's session"""
+    session = session_id()
+    _, _, state, _ = current_blink(session, follows_default())
+    return jsonify({
+        "status": "success",
+        "session_id": session,
+        "blink_state": state,
+        "direction": sessions.get(session, "direction", "ltr")
+    })
+
+
+def blink_message(source, version, state, sent_at):
+    return "data: " + json.dumps({
+        "state": state,
+        "version": version,
+        "source": source,
+        "sent_at": sent_at,
+        "received_at": time.time()
+    }) + "\n\n"
+
+
+def watch_blinks():
+    """Poll the store's blink change counter and wake this process's streams when it moves
+
+    One query per tick per process, however many readers are connected; this
+    is how transitions posted to another worker reach streams held here.
+    """
+    seen = sessions.change_seq("blink")
+    while True:
+        time.sleep(BLINK_POLL_SECONDS)
+        try:
+            seq = sessions.change_seq("blink")
+        except Exception as e:
+            log.warning("Blink watcher error", extra=fields(error=str(e)))
+            continue
+        if seq != seen:
+            seen = seq
+            with blink_changed:
+                blink_changed.notify_all()
+
+
+blink_watcher_lock = threading.Lock()
+blink_watcher = None
+
+
+def ensure_blink_watcher():
+    global blink_watcher
+    with blink_watcher_lock:
+        if blink_watcher is None:
+            blink_watcher = threading.Thread(target=watch_blinks, name="blink-watcher", daemon=True)
+            blink_watcher.start()
+
+
+def blink_events(session, follow_default=False):
+    """Yield an SSE message with the current state, then one per transition"""
+    ensure_blink_watcher()
+    source, version, state, sent_at = current_blink(session, follow_default)
+    seen = (source, version)
+    yield blink_message(source, version, state, sent_at)
+
+    while True:
+        with blink_changed:
+            woken = blink_changed.wait(timeout=BLINK_KEEPALIVE_SECONDS)
+
+        if not woken:
+            # Comments keep proxies from closing an idle stream
+            yield ": keepalive\n\n"
+            continue
+
+        source, version, state, sent_at = current_blink(session, follow_default)
+        if (source, version) != seen:
+            seen = (source, version)
+            yield blink_message(source, version, state, sent_at)
+
+
+@api.route("/blink/stream", methods=["GET"])
+def stream_blink():
+    """Server-sent events channel pushing blink transitions to the reader"""
+    return Response(
+        stream_with_context(blink_events(session_id(), follows_default())),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def report_first_request(app, created):
+    """Log and export how long after creation the first request arrived and how long it took"""
+    lock = threading.Lock()
+    state = {"seen": False}
+
+    @app.before_request
+    def first_request_started():
+        with lock:
+            if state["seen"]:
+                return
+            state["seen"] = True
+        g.first_request_started = time.perf_counter()
+
+    @app.after_request
+    def first_request_finished(response):
+        started = g.pop("first_request_started", None)
+        if started is not None:
+            seconds = time.perf_counter() - started
+            metrics.startup_seconds.set(round(seconds, 6), "first_request")
+            log.info("First request", extra=fields(
+                route=request.path, seconds=round(seconds, 4), after_start=round(started - created, 4)))
+        return response
+
+
+def create_app(warm=WARM_UP):
+    """Build the Flask app; the subsystems behind it load on first use or in the warm-up thread"""
+    started = time.perf_counter()
+    configure_logging()
+
+    app = Flask(__name__)
+    CORS(app)
+    metrics.install(app)
+    app.register_blueprint(api)
+    os.makedirs(app.static_folder, exist_ok=True)
+
+    created = time.perf_counter()
+    metrics.startup_seconds.set(round(IMPORT_SECONDS, 6), "import")
+    metrics.startup_seconds.set(round(created - started, 6), "create_app")
+    log.info("App created", extra=fields(
+        import_seconds=round(IMPORT_SECONDS, 4), create_seconds=round(created - started, 4), warm_up=warm))
+    report_first_request(app, created)
+
+    if warm:
+        warm_up(SUBSYSTEMS)
+    return app
+
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
 
 
 def main():
-    app.run(debug=False, host="0.0.0.0", port=5001)
+    create_app().run(debug=False, host="0.0.0.0", port=5001)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, request
+
+# --- CONFIGURATION ---
+# Per-stage timers inside PDF extraction and TTS synthesis; STAGE_TIMERS=0 turns them into no-ops
+STAGE_TIMERS = os.getenv("STAGE_TIMERS", "1") != "0"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, values)} {total}")
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, *label_values):
+        self.inc(*label_values, amount=-1)
+
+    def set(self, value, *label_values):
+        with self.lock:
+            self._values[label_values] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, rendered in the Prometheus text format"""
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum, count]
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket
+                    labels = _label_text(self.labels + ("le",), values + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _label_text(self.labels, values)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# One registry per process. Under several workers each one exposes its own
+# series, so scrape them individually or aggregate by instance.
+registry = Registry()
+
+request_latency = registry.register(Histogram(
+    "rsvp_request_duration_seconds", "Time to produce a response (first byte for streams)",
+    labels=("method", "route", "status")))
+requests_in_flight = registry.register(Gauge(
+    "rsvp_requests_in_flight", "Requests being handled", labels=("route",)))
+request_size = registry.register(Histogram(
+    "rsvp_request_size_bytes", "Request body sizes", labels=("route",), buckets=SIZE_BUCKETS))
+response_size = registry.register(Histogram(
+    "rsvp_response_size_bytes", "Response body sizes, streamed responses excluded",
+    labels=("route",), buckets=SIZE_BUCKETS))
+request_errors = registry.register(Counter(
+    "rsvp_request_errors_total", "Responses with a 4xx/5xx status or an unhandled exception",
+    labels=("route", "status")))
+stage_latency = registry.register(Histogram(
+    "rsvp_stage_duration_seconds", "Time spent in one stage of PDF extraction or TTS synthesis",
+    labels=("stage",)))
+blink_batch_size = registry.register(Histogram(
+    "rsvp_blink_batch_size", "Size of the micro-batch each server-side blink frame was computed in",
+    buckets=(1, 2, 4, 8, 16, 32, 64)))
+startup_seconds = registry.register(Gauge(
+    "rsvp_startup_seconds", "Worker startup: module import, app creation and the first request",
+    labels=("phase",)))
+subsystem_load_seconds = registry.register(Gauge(
+    "rsvp_subsystem_load_seconds", "Time to load a lazily initialized subsystem",
+    labels=("subsystem",)))
+
+
+@contextmanager
+def stage_timer(stage):
+    """Time a block into rsvp_stage_duration_seconds{stage=...}"""
+    if not STAGE_TIMERS:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_latency.observe(time.perf_counter() - started, stage)
+
+
+def _route():
+    # The URL rule, not the path, so ids in the URL don't each make a new series
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def install(app):
+    """Record latency, in-flight count, payload sizes and errors for every request of app"""
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_route = _route()
+        requests_in_flight.inc(g.metrics_route)
+        request_size.observe(request.content_length or 0, g.metrics_route)
+
+    @app.after_request
+    def record(response):
+        route = g.get("metrics_route", "unmatched")
+        started = g.get("metrics_started")
+        if started is not None:
+            request_latency.observe(time.perf_counter() - started, request.method, route, response.status_code)
+        if not response.is_streamed:
+            response_size.observe(response.calculate_content_length() or 0, route)
+        if response.status_code >= 400:
+            request_errors.inc(route, response.status_code)
+        return response
+
+    @app.teardown_request
+    def finish(exc):
+        route = g.pop("metrics_route", None)
+        if route is None:
+            return
+        requests_in_flight.dec(route)
+        if exc is not None:
+            request_errors.inc(route, 500)
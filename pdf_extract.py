@@ -0,0 +1,100 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from pypdf import PdfReader
+
+# --- CONFIGURATION ---
+# Documents this small are cheaper to extract inline than to ship to the pool
+INLINE_PAGE_LIMIT = 8
+# Lower bound on pages handed to one worker task, so each task amortizes opening the PDF
+MIN_PAGES_PER_TASK = 4
+# Aim for a few tasks per worker so results arrive in page order at a steady pace
+TASKS_PER_WORKER = 4
+MAX_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 1))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _start_method():
+    # Forking a threaded server copies its held locks into the workers; forkserver
+    # starts them from a clean process instead (spawn where it doesn't exist)
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+def get_executor():
+    """Process pool shared by all extraction requests, created on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS,
+                                                mp_context=multiprocessing.get_context(_start_method()))
+    return _executor
+
+
+def _extract_page_range(path, start, stop):
+    """Worker task: extract the text of pages [start, stop) from the PDF at path"""
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def count_pages(data):
+    return len(PdfReader(io.BytesIO(data)).pages)
+
+
+def _page_ranges(page_count):
+    per_task = max(MIN_PAGES_PER_TASK, -(-page_count // (MAX_WORKERS * TASKS_PER_WORKER)))
+    return [(start, min(start + per_task, page_count)) for start in range(0, page_count, per_task)]
+
+
+def iter_pages(data, page_count=None):
+    """Yield (page_number, text) for every page, in page order
+
+    Pages are extracted on the process pool and yielded as soon as every earlier
+    page is ready. If the consumer stops early (e.g. the client disconnected),
+    pending work is cancelled.
+    """
+    if page_count is None:
+        page_count = count_pages(data)
+
+    if page_count <= INLINE_PAGE_LIMIT:
+        reader = PdfReader(io.BytesIO(data))
+        for number, page in enumerate(reader.pages, start=1):
+            yield number, page.extract_text() or ""
+        return
+
+    # Workers read the upload from a temp file instead of each getting a pickled copy
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    futures = []
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+
+        executor = get_executor()
+        futures = [executor.submit(_extract_page_range, path, start, stop)
+                   for start, stop in _page_ranges(page_count)]
+
+        number = 0
+        for future in futures:
+            for text in future.result():
+                number += 1
+                yield number, text
+    finally:
+        for future in futures:
+            future.cancel()
+        # A task still running after a cancel just fails once the file is gone
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def extract_pages(data):
+    """Extract the whole document, returning the text of each page"""
+    return [text for _, text in iter_pages(data)]
@@ -4,11 +4,30 @@
 
 const API_BASE_URL = "http://localhost:5001";
 
+const PAGE_PARAMS = new URLSearchParams(window.location.search);
+
+// crypto.randomUUID only exists in secure contexts (https or localhost)
+function randomSessionId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    const bytes = new Uint8Array(16);
+    crypto.getRandomValues(bytes);
+    return Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+}
+
+// Keys this tab's state on the server (blinks, direction, events). ?session= in
+// the page URL pins it, e.g. to match `face_detection.py --session <id>`.
+const SESSION_ID = PAGE_PARAMS.get("session")
+    || sessionStorage.getItem("rsvpSessionId")
+    || randomSessionId();
+sessionStorage.setItem("rsvpSessionId", SESSION_ID);
+
 // ============================================================================
 // STATE MANAGEMENT
 // ============================================================================
 
-let words = [];
+let wordCount = 0;
 let currentIndex = 0;
 let isReading = false;
 let isPaused = false;
@@ -21,6 +40,21 @@ let audioAlignment = [];
 let audioPlayer = new Audio();
 let ttsEnabled = false;
 let isTTSMode = false; // Track if we're in TTS-synced mode
+let documentId = null; // Server-side id of the loaded document, used for search and word windows
+// Words and focal letters live in fixed-size blocks. Once the server has stored the
+// document, blocks far from the reading position are dropped and fetched again when needed.
+let wordBlocks = new Map(); // block index -> {words: [], focal: [] | null}, least recently used first
+let blockRequests = new Map(); // block index -> pending fetch
+const WORD_BLOCK_SIZE = 1024;
+const MAX_WORD_BLOCKS = 16;
+let wordDurations = null; // Per-word display times at layoutWpm
+let layoutWpm = null;
+let isExtracting = false; // True while PDF pages are still streaming in
+let directionRuns = null; // [{start_word, direction}] sorted by start_word
+let pendingEvents = []; // Events waiting to be sent in the next batch
+let eventFlushTimer = null;
+const EVENT_BATCH_SIZE = 50;
+const EVENT_FLUSH_MS = 2000;
 
 // ============================================================================
 // DOM ELEMENTS
@@ -132,15 +166,15 @@ function handleTxtOrMd(file) {
             currentFileName = file.name;
             const text = e.target.result;
             parseText(text);
-            showMessage(`Loaded "${file.name}" - ${words.length} words found`, "success");
+            showMessage(`Loaded "${file.name}" - ${wordCount} words found`, "success");
             fileInfo.classList.add("show");
-            fileInfo.innerHTML = `<strong>${file.name}</strong><br>${words.length} words loaded`;
+            fileInfo.innerHTML = `<strong>${file.name}</strong><br>${wordCount} words loaded`;
             rsvpSection.classList.add("active");
-            document.getElementById("totalWords").textContent = words.length;
+            document.getElementById("totalWords").textContent = wordCount;
 
             sendEventToBackend("file_uploaded", {
                 file_name: file.name,
-                word_count: words.length,
+                word_count: wordCount,
             });
         } catch (error) {
             showMessage("Error reading file: " + error.message, "error");
@@ -152,44 +186,88 @@ function handleTxtOrMd(file) {
     reader.readAsText(file);
 }
 
-function handlePdf(file) {
+async function handlePdf(file) {
     const formData = new FormData();
     formData.append("file", file);
 
-    fetch(`${API_BASE_URL}/api/extract-pdf`, {
-        method: "POST",
-        body: formData,
-    })
-        .then((response) => response.json())
-        .then((data) => {
-            if (data.status === "success") {
-                currentFileName = data.file_name;
-                parseText(data.text);
-                showMessage(`Loaded "${data.file_name}" - ${words.length} words found (${data.pages} pages)`, "success");
-                fileInfo.classList.add("show");
-                fileInfo.innerHTML = `<strong>${data.file_name}</strong><br>${words.length} words loaded from ${data.pages} pages`;
-                rsvpSection.classList.add("active");
-                document.getElementById("totalWords").textContent = words.length;
-
-                if (data.direction === "rtl") {
-                    document.querySelector(".rsvp-container").classList.add("rtl");
-                } else {
-                    document.querySelector(".rsvp-container").classList.remove("rtl");
-                }
+    // Pages stream back as NDJSON so reading can start before the whole book is parsed
+    resetWords();
+    documentId = null;
+    wordDurations = null;
+    layoutWpm = null;
+    directionRuns = [];
+    isExtracting = true;
+    let pageCount = 0;
 
-                sendEventToBackend("file_uploaded", {
-                    file_name: data.file_name,
-                    word_count: words.length,
-                    pages: data.pages,
-                    file_type: "pdf",
-                });
-            } else {
-                showMessage("Error extracting PDF: " + data.message, "error");
+    try {
+        // Page records carry their own focal letters, so the whole-document layout isn't needed
+        const response = await apiFetch(`/api/extract-pdf?stream=1&layout=0`, {
+            method: "POST",
+            body: formData,
+        });
+
+        if (!response.ok) {
+            const data = await response.json();
+            throw new Error(data.message);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split("\n");
+            buffer = lines.pop();
+
+            for (const line of lines) {
+                if (!line) continue;
+                const record = JSON.parse(line);
+
+                if (record.type === "meta") {
+                    currentFileName = record.file_name;
+                    pageCount = record.pages;
+                } else if (record.type === "page") {
+                    if (record.direction) {
+                        addDirectionRun(wordCount, record.direction);
+                    }
+                    appendText(record.text, record.focal_indices);
+                    fileInfo.classList.add("show");
+                    fileInfo.innerHTML = `<strong>${currentFileName}</strong><br>${wordCount} words loaded from ${record.page} of ${pageCount} pages`;
+                    rsvpSection.classList.add("active");
+                    document.getElementById("totalWords").textContent = wordCount;
+                } else if (record.type === "done") {
+                    directionRuns = record.direction_map || directionRuns;
+                    // Only trust the server's copy if it tokenized the text the same way we did
+                    documentId = record.word_count === wordCount ? record.document_id : null;
+                    if (record.direction === "rtl") {
+                        document.querySelector(".rsvp-container").classList.add("rtl");
+                    } else {
+                        document.querySelector(".rsvp-container").classList.remove("rtl");
+                    }
+                } else if (record.type === "error") {
+                    throw new Error(record.message);
+                }
             }
-        })
-        .catch((error) => {
-            showMessage("Error uploading PDF: " + error.message, "error");
+        }
+
+        isExtracting = false;
+        evictWordBlocks();
+        showMessage(`Loaded "${currentFileName}" - ${wordCount} words found (${pageCount} pages)`, "success");
+
+        sendEventToBackend("file_uploaded", {
+            file_name: currentFileName,
+            word_count: wordCount,
+            pages: pageCount,
+            file_type: "pdf",
         });
+    } catch (error) {
+        isExtracting = false;
+        showMessage("Error extracting PDF: " + error.message, "error");
+    }
 }
 
 // ============================================================================
@@ -197,9 +275,178 @@ function handlePdf(file) {
 // ============================================================================
 
 function parseText(text) {
-    words = text
-        .split(/[\s\-—]+/)
-        .filter((word) => word.length > 0);
+    resetWords();
+    appendText(text);
+    directionRuns = null;
+    documentId = null;
+    loadWordLayout(text, true);
+}
+
+function addDirectionRun(startWord, direction) {
+    const last = directionRuns[directionRuns.length - 1];
+    if (last && last.direction === direction) return;
+    if (last && last.start_word === startWord) {
+        last.direction = direction;
+        return;
+    }
+    directionRuns.push({ start_word: startWord, direction: direction });
+}
+
+function directionAt(index) {
+    if (!directionRuns || directionRuns.length === 0) return null;
+
+    // Binary search for the last run starting at or before index
+    let low = 0;
+    let high = directionRuns.length - 1;
+    while (low < high) {
+        const mid = (low + high + 1) >> 1;
+        if (directionRuns[mid].start_word <= index) {
+            low = mid;
+        } else {
+            high = mid - 1;
+        }
+    }
+    return directionRuns[low].direction;
+}
+
+function appendText(text, focal = null) {
+    const newWords = text.split(/[\s\-—]+/).filter((word) => word.length > 0);
+    newWords.forEach((word, i) => {
+        const blockIndex = Math.floor(wordCount / WORD_BLOCK_SIZE);
+        let block = wordBlocks.get(blockIndex);
+        if (!block) {
+            block = { words: [], focal: focal ? [] : null };
+            wordBlocks.set(blockIndex, block);
+        }
+        block.words.push(word);
+        if (block.focal) {
+            block.focal.push(focal ? focal[i] : null);
+        }
+        wordCount++;
+    });
+}
+
+// ============================================================================
+// WORD WINDOWS
+// ============================================================================
+
+function resetWords() {
+    wordCount = 0;
+    wordBlocks = new Map();
+    blockRequests = new Map();
+}
+
+function wordBlock(index) {
+    const blockIndex = Math.floor(index / WORD_BLOCK_SIZE);
+    const block = wordBlocks.get(blockIndex);
+    if (block) {
+        // Re-insert to mark it most recently used
+        wordBlocks.delete(blockIndex);
+        wordBlocks.set(blockIndex, block);
+    } else {
+        fetchWordBlock(blockIndex);
+    }
+    return block;
+}
+
+// The word at index, or undefined while its block is being fetched
+function wordAt(index) {
+    const block = wordBlock(index);
+    return block ? block.words[index % WORD_BLOCK_SIZE] : undefined;
+}
+
+function focalAt(index) {
+    const block = wordBlock(index);
+    const focal = block && block.focal ? block.focal[index % WORD_BLOCK_SIZE] : null;
+    return focal === undefined ? null : focal;
+}
+
+function fetchWordBlock(blockIndex) {
+    if (!documentId || blockIndex < 0 || blockIndex * WORD_BLOCK_SIZE >= wordCount) {
+        return Promise.resolve();
+    }
+    if (blockRequests.has(blockIndex)) {
+        return blockRequests.get(blockIndex);
+    }
+
+    const requestedFor = documentId;
+    const params = new URLSearchParams({ start: blockIndex * WORD_BLOCK_SIZE, count: WORD_BLOCK_SIZE });
+    const request = apiFetch(`/api/documents/${documentId}/words?${params}`)
+        .then((response) => (response.ok ? response.json() : null))
+        .then((data) => {
+            if (data && data.status === "success" && requestedFor === documentId) {
+                wordBlocks.set(blockIndex, { words: data.words, focal: data.focal_indices });
+                evictWordBlocks(blockIndex);
+            }
+        })
+        .catch((error) => console.error("Error fetching words:", error))
+        .finally(() => blockRequests.delete(blockIndex));
+    blockRequests.set(blockIndex, request);
+    return request;
+}
+
+// Fetch every block covering [start, end) that isn't held yet
+function ensureWords(start, end) {
+    const requests = [];
+    for (let b = Math.floor(start / WORD_BLOCK_SIZE); b * WORD_BLOCK_SIZE < end; b++) {
+        if (!wordBlocks.has(b)) requests.push(fetchWordBlock(b));
+    }
+    return Promise.all(requests);
+}
+
+// Drop least recently used blocks, never the ones around the reader or one just fetched
+function evictWordBlocks(justLoaded = null) {
+    // Blocks can only be dropped once the server can hand them back
+    if (!documentId || isExtracting) return;
+    const keep = Math.floor(currentIndex / WORD_BLOCK_SIZE);
+    for (const blockIndex of wordBlocks.keys()) {
+        if (wordBlocks.size <= MAX_WORD_BLOCKS) break;
+        if (Math.abs(blockIndex - keep) > 1 && blockIndex !== justLoaded) wordBlocks.delete(blockIndex);
+    }
+}
+
+function setFocalIndices(focal) {
+    for (const [blockIndex, block] of wordBlocks) {
+        const start = blockIndex * WORD_BLOCK_SIZE;
+        block.focal = focal.slice(start, start + block.words.length);
+    }
+}
+
+async function loadWordLayout(text, withDirections = false) {
+    // Fetch the focal letter of every word up front so reading needs no per-word requests
+    wordDurations = null;
+    layoutWpm = null;
+    const expectedCount = wordCount;
+
+    try {
+        const response = await apiFetch(`/api/process-text`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ text: text, wpm: wordsPerMinute, directions: withDirections }),
+        });
+
+        if (!response.ok) {
+            console.error("Failed to load word layout from backend");
+            return;
+        }
+
+        const data = await response.json();
+
+        // Only trust the layout if it tokenized the text the same way we did
+        if (data.status === "success" && data.word_count === expectedCount && wordCount === expectedCount) {
+            setFocalIndices(data.focal_indices);
+            documentId = data.document_id || null;
+            evictWordBlocks();
+            wordDurations = data.durations_ms || null;
+            layoutWpm = data.wpm || null;
+            // Only requested for plain text; PDFs already have a per-page map
+            if (data.direction_map) {
+                directionRuns = data.direction_map;
+            }
+        }
+    } catch (error) {
+        console.error("Error loading word layout:", error);
+    }
 }
 
 // ============================================================================
@@ -267,7 +514,7 @@ function adjustWPM(delta) {
 async function startReading() {
     if (event) event.preventDefault();
 
-    if (words.length === 0) {
+    if (wordCount === 0) {
         showMessage("Please upload a file first", "error");
         return;
     }
@@ -302,15 +549,18 @@ async function startTTSMode(currentWPM) {
         showMessage("🎙️ Generating speech audio... Please wait", "success");
         
         console.log("TTS Mode: Starting generation...");
-        console.log(`Text: ${words.length} words, WPM: ${currentWPM}`);
+        console.log(`Text: ${wordCount} words, WPM: ${currentWPM}`);
         
-        const response = await fetch(`${API_BASE_URL}/api/generate-tts`, {
+        // A stored document is named rather than sent, since only a window of it is held here
+        let ttsRequest = { document_id: documentId, wpm: currentWPM };
+        if (!documentId) {
+            await ensureWords(0, wordCount);
+            ttsRequest = { text: Array.from({ length: wordCount }, (_, i) => wordAt(i)).join(" "), wpm: currentWPM };
+        }
+        const response = await apiFetch(`/api/generate-tts`, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ 
-                text: words.join(" "), 
-                wpm: currentWPM 
-            })
+            body: JSON.stringify(ttsRequest)
         });
         
         console.log("TTS Response status:", response.status);
@@ -347,12 +597,12 @@ async function startTTSMode(currentWPM) {
                 const wordData = audioAlignment[i];
                 if (currentTimeMs >= wordData.start_time_ms && currentTimeMs <= wordData.end_time_ms) {
                     // Find this word in our words array
-                    if (i !== currentIndex && i < words.length) {
+                    if (i !== currentIndex && i < wordCount) {
                         currentIndex = i;
-                        processWordWithBackend(words[i]);
+                        showWord(i);
                         updateContextDisplay();
                         document.getElementById("currentWord").textContent = currentIndex + 1;
-                        const progress = ((currentIndex + 1) / words.length) * 100;
+                        const progress = ((currentIndex + 1) / wordCount) * 100;
                         document.getElementById("progressFill").style.width = progress + "%";
                     }
                     break;
@@ -508,9 +758,14 @@ function loadCustomMusic(event) {
 function updateContextDisplay() {
     const contextRadius = 10;
     const start = Math.max(0, currentIndex - contextRadius);
-    const end = Math.min(words.length, currentIndex + contextRadius + 1);
+    const end = Math.min(wordCount, currentIndex + contextRadius + 1);
     
-    const contextWords = words.slice(start, end);
+    // Words still being fetched show as an ellipsis until the next update
+    const contextWords = [];
+    for (let i = start; i < end; i++) {
+        const word = wordAt(i);
+        contextWords.push(word === undefined ? "…" : word);
+    }
     
     const html = contextWords
         .map((word, idx) => {
@@ -525,25 +780,41 @@ function updateContextDisplay() {
     document.getElementById("contextText").innerHTML = html;
 }
 
-function jumpToWord(index) {
-    if (index < 0 || index >= words.length) {
+async function jumpToWord(index) {
+    if (index < 0 || index >= wordCount) {
         return;
     }
+    await ensureWords(index - 10, index + 11);
     currentIndex = index;
     clearTimeout(readingTimeout);
     
-    processWordWithBackend(words[index]);
+    showWord(index);
     updateContextDisplay();
     document.getElementById("currentWord").textContent = index + 1;
-    document.getElementById("progressFill").style.width = ((index + 1) / words.length) * 100 + "%";
+    document.getElementById("progressFill").style.width = ((index + 1) / wordCount) * 100 + "%";
     
     sendEventToBackend("word_jumped", {
         word_index: index,
-        word: words[index],
+        word: wordAt(index),
     });
 }
 
-function searchNextWord() {
+// Scans only the words held locally, which is all of them until the server has the document
+function findNextLocally(searchTerm) {
+    const matches = (i) => {
+        const word = wordAt(i);
+        return word !== undefined && word.toLowerCase().includes(searchTerm);
+    };
+    for (let i = currentIndex + 1; i < wordCount; i++) {
+        if (matches(i)) return i;
+    }
+    for (let i = 0; i <= currentIndex && i < wordCount; i++) {
+        if (matches(i)) return i;
+    }
+    return -1;
+}
+
+async function searchNextWord() {
     const searchTerm = document.getElementById("searchInput").value.toLowerCase().trim();
     const searchMessage = document.getElementById("searchMessage");
     
@@ -560,31 +831,37 @@ function searchNextWord() {
     }
     
     let foundIndex = -1;
-    for (let i = currentIndex + 1; i < words.length; i++) {
-        if (words[i].toLowerCase().includes(searchTerm)) {
-            foundIndex = i;
-            break;
-        }
-    }
-    
-    if (foundIndex === -1) {
-        for (let i = 0; i <= currentIndex; i++) {
-            if (words[i].toLowerCase().includes(searchTerm)) {
-                foundIndex = i;
-                break;
+    let matchCount = null;
+    // The server index answers from the whole document; a PDF still streaming in is searched locally
+    if (documentId && !isExtracting) {
+        try {
+            const params = new URLSearchParams({ q: searchTerm, after: currentIndex });
+            const response = await apiFetch(`/api/documents/${documentId}/search?${params}`);
+            if (response.ok) {
+                const data = await response.json();
+                foundIndex = data.position === null ? -1 : data.position;
+                matchCount = data.count;
+            } else {
+                foundIndex = findNextLocally(searchTerm);
             }
+        } catch (error) {
+            console.error("Search request failed, searching locally:", error);
+            foundIndex = findNextLocally(searchTerm);
         }
+    } else {
+        foundIndex = findNextLocally(searchTerm);
     }
     
     if (foundIndex !== -1) {
-        jumpToWord(foundIndex);
-        searchMessage.textContent = `Found "${searchTerm}" in "${words[foundIndex]}" at word ${foundIndex + 1} of ${words.length}`;
+        await jumpToWord(foundIndex);
+        const countText = matchCount === null ? "" : ` (${matchCount} matches)`;
+        searchMessage.textContent = `Found "${searchTerm}" in "${wordAt(foundIndex)}" at word ${foundIndex + 1} of ${wordCount}${countText}`;
         searchMessage.style.color = "#86efac";
         
         sendEventToBackend("word_searched", {
             search_term: searchTerm,
             word_index: foundIndex,
-            word: words[foundIndex],
+            word: wordAt(foundIndex),
         });
     } else {
         searchMessage.textContent = `"${searchTerm}" not found in document`;
@@ -596,8 +873,14 @@ function displayNextWord() {
     // Don't run timer-based display in TTS mode
     if (isTTSMode) return;
     
-    if (!isReading || currentIndex >= words.length) {
-        if (currentIndex >= words.length) {
+    // Caught up with a PDF that is still streaming in: wait for more pages
+    if (isReading && isExtracting && currentIndex >= wordCount) {
+        readingTimeout = setTimeout(displayNextWord, 100);
+        return;
+    }
+
+    if (!isReading || currentIndex >= wordCount) {
+        if (currentIndex >= wordCount) {
             isReading = false;
             document.getElementById("startButton").disabled = false;
             document.getElementById("pauseButton").disabled = true;
@@ -607,17 +890,38 @@ function displayNextWord() {
         return;
     }
 
-    const currentWord = words[currentIndex];
+    // The word's block is still on its way from the server: try again shortly
+    if (wordAt(currentIndex) === undefined) {
+        readingTimeout = setTimeout(displayNextWord, 50);
+        return;
+    }
+    // Fetch the next block well before the reader reaches it
+    wordAt(Math.min(wordCount - 1, currentIndex + WORD_BLOCK_SIZE / 2));
+
     document.getElementById("currentWord").textContent = currentIndex + 1;
 
-    const progress = ((currentIndex + 1) / words.length) * 100;
+    const progress = ((currentIndex + 1) / wordCount) * 100;
     document.getElementById("progressFill").style.width = progress + "%";
 
     updateContextDisplay();
-    processWordWithBackend(currentWord);
+    showWord(currentIndex);
 
+    const wordDelay = getWordDelay(currentIndex);
     currentIndex++;
 
+    readingTimeout = setTimeout(() => {
+        if (isReading && !isTTSMode) {
+            displayNextWord();
+        }
+    }, wordDelay);
+}
+
+function getWordDelay(index) {
+    if (wordDurations && layoutWpm === wordsPerMinute) {
+        return wordDurations[index];
+    }
+
+    const currentWord = wordAt(index) || "";
     const delayMs = 60000 / wordsPerMinute;
     let extraPause = (currentWord.length * (delayMs / 1000)) * currentWord.length;
 
@@ -628,11 +932,7 @@ function displayNextWord() {
         extraPause += 50;
     }
 
-    readingTimeout = setTimeout(() => {
-        if (isReading && !isTTSMode) {
-            displayNextWord();
-        }
-    }, delayMs + extraPause);
+    return delayMs + extraPause;
 }
 
 // ============================================================================
@@ -652,9 +952,37 @@ function updateSpeed() {
 // BACKEND COMMUNICATION
 // ============================================================================
 
+function apiFetch(path, options = {}) {
+    return fetch(`${API_BASE_URL}${path}`, {
+        ...options,
+        headers: { ...(options.headers || {}), "X-Session-Id": SESSION_ID },
+    });
+}
+
+function showWord(index) {
+    const word = wordAt(index);
+    if (word === undefined) {
+        ensureWords(index, index + 1).then(() => {
+            if (currentIndex === index && wordAt(index) !== undefined) showWord(index);
+        });
+        return;
+    }
+    const focal = focalAt(index);
+
+    // Use the precomputed layout when we have it, otherwise ask the backend
+    if (focal !== null) {
+        // The backend counts code points, not UTF-16 units, so split the word the same way
+        const chars = Array.from(word);
+        const focalIndex = Math.min(focal, chars.length - 1);
+        renderWord(chars.slice(0, focalIndex).join(""), chars[focalIndex], chars.slice(focalIndex + 1).join(""), focalIndex, directionAt(index));
+    } else {
+        processWordWithBackend(word);
+    }
+}
+
 async function processWordWithBackend(word) {
     try {
-        const response = await fetch(`${API_BASE_URL}/api/process-word`, {
+        const response = await apiFetch(`/api/process-word`, {
             method: "POST",
             headers: {
                 "Content-Type": "application/json",
@@ -671,7 +999,7 @@ async function processWordWithBackend(word) {
         const data = await response.json();
         
         if (data.before !== undefined && data.focal !== undefined && data.after !== undefined) {
-            renderWord(data.before, data.focal, data.after, data.focal_index);
+            renderWord(data.before, data.focal, data.after, data.focal_index, directionAt(currentIndex));
         } else {
             renderWordSimple(word);
         }
@@ -681,12 +1009,14 @@ async function processWordWithBackend(word) {
     }
 }
 
-function renderWord(before, focal, after, focalIndex) {
+function renderWord(before, focal, after, focalIndex, direction = null) {
     const rsvpWordElement = document.getElementById("rsvpWord");
     const container = document.querySelector(".rsvp-container");
 
+    // Prefer the detected direction of the segment; fall back to the word's own script
     const rtlRegex = /[\u0590-\u08FF]/; 
-    if (rtlRegex.test(before + focal + after)) {
+    const isRtl = direction ? direction === "rtl" : rtlRegex.test(before + focal + after);
+    if (isRtl) {
         container.classList.add("rtl");
     } else {
         container.classList.remove("rtl");
@@ -703,10 +1033,11 @@ function renderWord(before, focal, after, focalIndex) {
 function renderWordSimple(word) {
     const rsvpWordElement = document.getElementById("rsvpWord");
     
-    const focalIndex = Math.floor(word.length / 2);
-    const before = word.substring(0, focalIndex);
-    const focal = word[focalIndex];
-    const after = word.substring(focalIndex + 1);
+    const chars = Array.from(word);
+    const focalIndex = Math.floor(chars.length / 2);
+    const before = chars.slice(0, focalIndex).join("");
+    const focal = chars[focalIndex];
+    const after = chars.slice(focalIndex + 1).join("");
     
     const html = `
         <span class="word-part before">${before}</span><span class="word-part focal">${focal}</span><span class="word-part after">${after}</span>
@@ -716,58 +1047,95 @@ function renderWordSimple(word) {
     rsvpWordElement.style.transform = 'translateX(0)';
 }
 
-async function sendEventToBackend(eventType, additionalData = {}) {
-    try {
-        const eventData = {
-            event_type: eventType,
-            wpm: wordsPerMinute,
-            current_word_index: currentIndex,
-            total_words: words.length,
-            file_name: currentFileName,
-            is_reading: isReading,
-            is_paused: isPaused,
-            ...additionalData,
-        };
+function sendEventToBackend(eventType, additionalData = {}) {
+    // Events are queued and sent in batches; flushEvents() posts them
+    pendingEvents.push({
+        event_type: eventType,
+        wpm: wordsPerMinute,
+        current_word_index: currentIndex,
+        total_words: wordCount,
+        file_name: currentFileName,
+        is_reading: isReading,
+        is_paused: isPaused,
+        client_timestamp: new Date().toISOString(),
+        ...additionalData,
+    });
+
+    if (pendingEvents.length >= EVENT_BATCH_SIZE) {
+        flushEvents();
+    } else if (!eventFlushTimer) {
+        eventFlushTimer = setTimeout(flushEvents, EVENT_FLUSH_MS);
+    }
+}
 
-        const response = await fetch(`${API_BASE_URL}/api/event`, {
+async function flushEvents(keepalive = false) {
+    clearTimeout(eventFlushTimer);
+    eventFlushTimer = null;
+    if (pendingEvents.length === 0) return;
+
+    const batch = pendingEvents;
+    pendingEvents = [];
+
+    try {
+        const response = await apiFetch(`/api/events`, {
             method: "POST",
             headers: {
                 "Content-Type": "application/json",
             },
-            body: JSON.stringify(eventData),
+            body: JSON.stringify({ events: batch }),
+            // Lets the last batch outlive the page when it is being closed
+            keepalive: keepalive,
         });
 
         if (!response.ok) {
-            console.error("Failed to send event to backend");
+            console.error("Failed to send events to backend");
         }
     } catch (error) {
-        console.error("Error sending event to backend:", error);
+        console.error("Error sending events to backend:", error);
     }
 }
 
+document.addEventListener("visibilitychange", () => {
+    if (document.visibilityState === "hidden") {
+        flushEvents(true);
+    }
+});
+
 // ============================================================================
 // BLINK DETECTION INTEGRATION
 // ============================================================================
 
-setInterval(async () => {
-    try {
-        const res = await fetch(`${API_BASE_URL}/blink_state`);
-        const data = await res.json();
-
-        if (data.state === "closed" && isReading && !isPaused) {
-            console.log("👁️ Blink detected: Pausing");
-            // Blink pauses do NOT pause music
-            pauseReading();
-        } 
-        else if (data.state === "open" && isPaused && !manualPause) {
-            console.log("👁️ Eyes open: Resuming");
-            // Blink resumes do NOT resume music
-            resumeReading();
+function handleBlinkState(data) {
+    if (data.state === "closed" && isReading && !isPaused) {
+        console.log("👁️ Blink detected: Pausing");
+        // Blink pauses do NOT pause music
+        pauseReading();
+
+        // Detector and browser share a clock when run on the same machine
+        if (data.sent_at) {
+            sendEventToBackend("blink_paused", {
+                latency_ms: Math.round(Date.now() - data.sent_at * 1000),
+            });
         }
-    } catch (err) {
-        // Silent fail if backend down
+    } 
+    else if (data.state === "open" && isPaused && !manualPause) {
+        console.log("👁️ Eyes open: Resuming");
+        // Blink resumes do NOT resume music
+        resumeReading();
     }
-}, 100);
+}
+
+// The server pushes each open/closed transition; EventSource reconnects on its own if the backend restarts
+// EventSource can't send headers, so the session goes in the query string. ?follow=default
+// in the page URL follows a detector started without --session.
+const blinkStreamParams = new URLSearchParams({ session: SESSION_ID });
+if (PAGE_PARAMS.get("follow")) {
+    blinkStreamParams.set("follow", PAGE_PARAMS.get("follow"));
+}
+const blinkStream = new EventSource(`${API_BASE_URL}/blink/stream?${blinkStreamParams}`);
+blinkStream.onmessage = (event) => {
+    handleBlinkState(JSON.parse(event.data));
+};
 
 // ============================================================================
 // UI UTILITIES
@@ -0,0 +1,133 @@
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from heapq import merge
+
+from text_layout import tokenize
+
+# --- CONFIGURATION ---
+# Longest n-gram indexed; terms at least this long are looked up by their n-grams of this length
+GRAM_SIZE = 3
+# Documents whose index is kept in memory per process
+MAX_INDEXES = 16
+# Merged match lists kept per document, so repeated searches for a term are a single bisect
+MAX_CACHED_TERMS = 64
+
+
+def grams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class SearchIndex:
+    """Substring search over one document's words
+
+    Each distinct (lowercased) word keeps the sorted positions where it occurs,
+    and every 1- to GRAM_SIZE-gram maps to the distinct words containing it.
+    A term's candidates come from intersecting its n-grams over the vocabulary,
+    which is far smaller than the document, and the next match after a position
+    is a bisect into the merged positions of the words that really contain it.
+    Positions are word indices, as produced by text_layout.tokenize().
+    """
+
+    def __init__(self, words):
+        vocabulary = {}
+        positions = []
+        for position, word in enumerate(words):
+            word = word.lower()
+            word_id = vocabulary.get(word)
+            if word_id is None:
+                word_id = vocabulary[word] = len(positions)
+                positions.append(array("I"))
+            positions[word_id].append(position)
+
+        postings = {}
+        for word, word_id in vocabulary.items():
+            for size in range(1, GRAM_SIZE + 1):
+                for gram in grams(word, size):
+                    postings.setdefault(gram, []).append(word_id)
+
+        self.word_count = len(words)
+        self.vocabulary = list(vocabulary)
+        self.positions = positions
+        self.postings = postings
+        self.lock = threading.Lock()
+        self._matches = OrderedDict()  # term -> merged positions, most recently used last
+
+    @classmethod
+    def from_text(cls, text):
+        words, _ = tokenize(text)
+        return cls(words)
+
+    def _candidates(self, term):
+        """Ids of the words containing every n-gram of term, smallest posting list first"""
+        size = min(GRAM_SIZE, len(term))
+        lists = sorted((self.postings.get(gram, ()) for gram in grams(term, size)), key=len)
+        if not lists or not lists[0]:
+            return []
+        candidates = set(lists[0])
+        for ids in lists[1:]:
+            candidates.intersection_update(ids)
+            if not candidates:
+                break
+        return candidates
+
+    def matches(self, term):
+        """Sorted word positions whose word contains term (case-insensitive)"""
+        term = term.lower()
+        with self.lock:
+            cached = self._matches.get(term)
+            if cached is not None:
+                self._matches.move_to_end(term)
+                return cached
+
+        if not term:
+            found = []
+        else:
+            # n-grams narrow the vocabulary; the substring check removes words with the grams out of order
+            ids = [word_id for word_id in self._candidates(term) if term in self.vocabulary[word_id]]
+            found = array("I", merge(*(self.positions[word_id] for word_id in ids)))
+
+        with self.lock:
+            self._matches[term] = found
+            while len(self._matches) > MAX_CACHED_TERMS:
+                self._matches.popitem(last=False)
+        return found
+
+    def find_next(self, term, after=-1):
+        """Return (position, count, wrapped) for the first match after position after
+
+        Wraps around to the first match in the document when none follows;
+        position is None when term does not occur at all.
+        """
+        found = self.matches(term)
+        if not found:
+            return None, 0, False
+        i = bisect_right(found, after)
+        if i < len(found):
+            return found[i], len(found), False
+        return found[0], len(found), True
+
+
+class SearchIndexCache:
+    """The most recently used documents' indexes, held in this process"""
+
+    def __init__(self, max_indexes=MAX_INDEXES):
+        self.max_indexes = max_indexes
+        self.lock = threading.Lock()
+        self._indexes = OrderedDict()
+
+    def get(self, document_id):
+        with self.lock:
+            index = self._indexes.get(document_id)
+            if index is not None:
+                self._indexes.move_to_end(document_id)
+            return index
+
+    def put(self, document_id, index):
+        with self.lock:
+            self._indexes[document_id] = index
+            self._indexes.move_to_end(document_id)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
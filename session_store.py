@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+
+from sqlite_pool import ConnectionPool
+
+# --- CONFIGURATION ---
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join("data", "sessions.db"))
+# Sessions untouched for this long are evicted with all their state
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 6 * 60 * 60))
+# last_seen is only rewritten when older than this, so reads don't turn into writes
+TOUCH_INTERVAL_SECONDS = 30
+EVICT_INTERVAL_SECONDS = 60
+
+DEFAULT_SESSION = "default"
+
+
+def same_value(current, value, compare_key=None):
+    """Whether value leaves current unchanged, comparing only compare_key when values are dicts"""
+    if compare_key is not None and isinstance(current, dict) and isinstance(value, dict):
+        return current.get(compare_key) == value.get(compare_key)
+    return current == value
+
+
+class MemorySessionStore:
+    """Session state kept in this process only; fine for a single worker and for tests"""
+
+    def __init__(self, ttl=SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._sessions = {}  # session id -> {"last_seen": float, "values": {key: (value, version)}}
+        self._changes = {}  # key -> number of changes to it across all sessions
+        self._last_evict = time.time()
+
+    def _session(self, session_id, now):
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = {"last_seen": now, "values": {}}
+        session["last_seen"] = now
+        return session
+
+    def get(self, session_id, key, default=None):
+        value, _ = self.get_versioned(session_id, key, default)
+        return value
+
+    def get_versioned(self, session_id, key, default=None):
+        """Return (value, version); version is 0 for a key never set"""
+        now = time.time()
+        with self.lock:
+            self._maybe_evict(now)
+            session = self._sessions.get(session_id)
+            if session is None or key not in session["values"]:
+                return default, 0
+            session["last_seen"] = now
+            return session["values"][key]
+
+    def set(self, session_id, key, value, only_if_changed=False, compare_key=None):
+        """Store value and return (changed, version)
+
+        With only_if_changed a value equal to the stored one (or, for dicts,
+        equal in compare_key) is not written and does not bump the version.
+        """
+        now = time.time()
+        with self.lock:
+            self._maybe_evict(now)
+            values = self._session(session_id, now)["values"]
+            current, version = values.get(key, (None, 0))
+            if only_if_changed and version and same_value(current, value, compare_key):
+                return False, version
+            values[key] = (value, version + 1)
+            self._changes[key] = self._changes.get(key, 0) + 1
+            return True, version + 1
+
+    def change_seq(self, key):
+        """A counter bumped whenever key changes in any session, cheap enough to poll"""
+        with self.lock:
+            return self._changes.get(key, 0)
+
+    def _maybe_evict(self, now):
+        if now - self._last_evict < EVICT_INTERVAL_SECONDS:
+            return
+        self._last_evict = now
+        expired = [sid for sid, session in self._sessions.items() if now - session["last_seen"] > self.ttl]
+        for session_id in expired:
+            del self._sessions[session_id]
+
+    def count(self):
+        with self.lock:
+            return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """Session state in a WAL-mode SQLite file, shared by every worker process on the host
+
+    Values are stored as JSON with a version that is bumped on every change,
+    and each key has a store-wide change counter, so a process can watch a
+    single row to learn that some session's value moved.
+    """
+
+    def __init__(self, path=SESSION_DB_PATH, ttl=SESSION_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.pool = ConnectionPool(path)
+        self.lock = threading.Lock()
+        self._touched = {}  # session id -> when this process last wrote its last_seen
+        self._last_evict = 0.0
+
+        with self.pool.connection() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    last_seen REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS session_state (
+                    session_id TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    PRIMARY KEY (session_id, key)
+                );
+                CREATE TABLE IF NOT EXISTS key_changes (
+                    key TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen);
+            """)
+
+    def _needs_touch(self, session_id, now):
+        with self.lock:
+            if now - self._touched.get(session_id, 0) < TOUCH_INTERVAL_SECONDS:
+                return False
+            if len(self._touched) > 10000:
+                self._touched.clear()
+            self._touched[session_id] = now
+            return True
+
+    def _touch(self, db, session_id, now):
+        db.execute(
+            "INSERT INTO sessions (session_id, last_seen) VALUES (?, ?) "
+            "ON CONFLICT (session_id) DO UPDATE SET last_seen = excluded.last_seen",
+            (session_id, now)
+        )
+
+    def get(self, session_id, key, default=None):
+        value, _ = self.get_versioned(session_id, key, default)
+        return value
+
+    def get_versioned(self, session_id, key, default=None):
+        """Return (value, version); version is 0 for a key never set"""
+        now = time.time()
+        self._maybe_evict(now)
+        with self.pool.connection() as db:
+            row = db.execute(
+                "SELECT value, version FROM session_state WHERE session_id = ? AND key = ?",
+                (session_id, key)
+            ).fetchone()
+            if row is None:
+                return default, 0
+            # Reads only write last_seen once per TOUCH_INTERVAL_SECONDS per process
+            if self._needs_touch(session_id, now):
+                self._touch(db, session_id, now)
+        return json.loads(row[0]), row[1]
+
+    def set(self, session_id, key, value, only_if_changed=False, compare_key=None):
+        """Store value and return (changed, version)
+
+        With only_if_changed a value equal to the stored one (or, for dicts,
+        equal in compare_key) is not written and does not bump the version.
+        The compare and the write happen in one transaction.
+        """
+        now = time.time()
+        self._maybe_evict(now)
+        encoded = json.dumps(value)
+
+        with self.pool.transaction() as db:
+            row = db.execute(
+                "SELECT value, version FROM session_state WHERE session_id = ? AND key = ?",
+                (session_id, key)
+            ).fetchone()
+            if only_if_changed and row is not None and same_value(json.loads(row[0]), value, compare_key):
+                return False, row[1]
+
+            version = (row[1] if row else 0) + 1
+            db.execute(
+                "INSERT INTO session_state (session_id, key, value, version) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (session_id, key) DO UPDATE SET value = excluded.value, version = excluded.version",
+                (session_id, key, encoded, version)
+            )
+            db.execute(
+                "INSERT INTO key_changes (key, seq) VALUES (?, 1) "
+                "ON CONFLICT (key) DO UPDATE SET seq = seq + 1",
+                (key,)
+            )
+            self._touch(db, session_id, now)
+            with self.lock:
+                self._touched[session_id] = now
+            return True, version
+
+    def change_seq(self, key):
+        """A counter bumped whenever key changes in any session, cheap enough to poll"""
+        with self.pool.connection() as db:
+            row = db.execute("SELECT seq FROM key_changes WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _maybe_evict(self, now):
+        with self.lock:
+            if now - self._last_evict < EVICT_INTERVAL_SECONDS:
+                return
+            self._last_evict = now
+        cutoff = now - self.ttl
+        with self.pool.transaction() as db:
+            db.execute(
+                "DELETE FROM session_state WHERE session_id IN "
+                "(SELECT session_id FROM sessions WHERE last_seen < ?)",
+                (cutoff,)
+            )
+            db.execute("DELETE FROM sessions WHERE last_seen < ?", (cutoff,))
+
+    def count(self):
+        with self.pool.connection() as db:
+            return db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_store():
+    """SESSION_BACKEND=memory keeps state in-process; the default SQLite store is shared across workers"""
+    if os.getenv("SESSION_BACKEND") == "memory":
+        return MemorySessionStore()
+    return SQLiteSessionStore()
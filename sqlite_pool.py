@@ -0,0 +1,63 @@
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+# Idle connections kept per pool; more are opened under load and closed when handed back
+POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", 8))
+
+
+class ConnectionPool:
+    """A small pool of autocommit connections to one WAL-mode SQLite file
+
+    Request threads come and go, so connections are borrowed per call rather
+    than tied to a thread; a burst of requests reuses the same few handles.
+    """
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=size)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self.connection() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA busy_timeout=5000")
+        return db
+
+    @contextmanager
+    def connection(self):
+        try:
+            db = self._idle.get_nowait()
+        except queue.Empty:
+            db = self._connect()
+        try:
+            yield db
+        finally:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            try:
+                self._idle.put_nowait(db)
+            except queue.Full:
+                db.close()
+
+    @contextmanager
+    def transaction(self):
+        """A connection inside BEGIN IMMEDIATE, committed on success and rolled back on error
+
+        Taking the write lock up front makes read-modify-write sequences atomic across processes.
+        """
+        with self.connection() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
@@ -0,0 +1,57 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import blink_inference
+    from blink_inference import BlinkBatcher, parse_points
+except ImportError:  # numpy is only needed by the blink extra
+    blink_inference = None
+
+
+def landmarks(openness):
+    points = []
+    for x0 in (0, 60):
+        half = 30 * openness / 2
+        points += [[x0, 0], [x0 + 10, -half], [x0 + 20, -half], [x0 + 30, 0], [x0 + 20, half], [x0 + 10, half]]
+    return points
+
+
+@unittest.skipIf(blink_inference is None, "numpy is not installed")
+class BlinkBatcherTest(unittest.TestCase):
+    def test_parse_points_rejects_wrong_shapes(self):
+        self.assertEqual(parse_points(landmarks(0.3)).shape, (2, 6, 2))
+        for bad in (None, [[1, 2]] * 11, [[1, 2, 3]] * 12, [["a", "b"]] * 12, [[float("nan"), 0]] * 12):
+            with self.assertRaises(ValueError):
+                parse_points(bad)
+
+    def test_concurrent_frames_share_batches_and_keep_their_own_results(self):
+        batcher = BlinkBatcher(workers=0, max_wait=0.05)
+        gate = threading.Event()
+        results = {}
+
+        def send(n):
+            gate.wait()
+            points = parse_points(landmarks(0.1 if n % 2 else 0.3))
+            results[n] = batcher.submit(points=points).result(timeout=5)
+
+        threads = [threading.Thread(target=send, args=(n,)) for n in range(16)]
+        for thread in threads:
+            thread.start()
+        gate.set()
+        for thread in threads:
+            thread.join()
+
+        for n, result in results.items():
+            self.assertEqual(result["state"], "closed" if n % 2 else "open")
+            self.assertAlmostEqual(result["ear"], 0.1 if n % 2 else 0.3, places=5)
+        stats = batcher.stats()
+        self.assertEqual(stats["frames"], 16)
+        self.assertLess(stats["batches"], 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
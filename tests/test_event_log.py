@@ -0,0 +1,114 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import event_log
+from event_log import EventLog, format_cursor
+
+
+def events(count, event_type="word_searched", start=0):
+    return [{"event_type": event_type, "n": start + i} for i in range(count)]
+
+
+class EventLogTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def open_log(self, **kwargs):
+        log = EventLog(self.directory, **kwargs)
+        self.addCleanup(log.close)
+        return log
+
+    def test_cursor_paging(self):
+        log = self.open_log()
+        log.append_many(events(25))
+
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            page, cursor, has_more = log.read(cursor, limit=10)
+            seen.extend(event["n"] for event in page)
+            pages += 1
+            if not has_more:
+                break
+
+        self.assertEqual(seen, list(range(25)))
+        self.assertEqual(pages, 3)
+
+        # A finished cursor picks up events appended later
+        log.append_many(events(2, start=25))
+        page, _, has_more = log.read(cursor, limit=10)
+        self.assertEqual([event["n"] for event in page], [25, 26])
+        self.assertFalse(has_more)
+
+    def test_filtered_read_stops_at_scan_limit(self):
+        log = self.open_log()
+        log.append_many(events(30, event_type="wpm_changed"))
+        log.append_many(events(1, event_type="word_searched"))
+
+        with mock.patch.object(event_log, "MAX_SCAN_LINES", 10):
+            page, cursor, has_more = log.read(limit=5, event_type="word_searched")
+            # Nothing matched within the scan budget, but the cursor moved past what was scanned
+            self.assertEqual(page, [])
+            self.assertTrue(has_more)
+            self.assertEqual(log.read(cursor, limit=100)[0][0]["n"], 10)
+
+            while has_more and not page:
+                page, cursor, has_more = log.read(cursor, limit=5, event_type="word_searched")
+        self.assertEqual([event["event_type"] for event in page], ["word_searched"])
+
+    def test_cursor_into_deleted_segment_resumes_at_oldest(self):
+        log = self.open_log(segment_max_bytes=200, max_segments=2)
+        _, old_cursor, _ = log.read(limit=1)
+        log.append_many(events(1))
+        _, old_cursor, _ = log.read(limit=1)
+
+        for i in range(20):
+            log.append_many(events(2, start=1 + 2 * i))
+        self.assertGreater(log.segments[0], 0)
+
+        page, _, _ = log.read(old_cursor, limit=1000)
+        oldest, _, _ = log.read(format_cursor(log.segments[0], 0), limit=1000)
+        self.assertEqual(page, oldest)
+        self.assertEqual(log.stats()["total_events"], 41)
+
+    def test_clear_is_seen_by_another_instance(self):
+        first = self.open_log()
+        second = self.open_log()
+        first.append_many(events(5))
+        self.assertEqual(second.stats()["total_events"], 5)
+
+        second.clear()
+        self.assertEqual(first.stats()["total_events"], 0)
+        self.assertEqual(first.recent(), [])
+        self.assertEqual(first.read()[0], [])
+
+        first.append_many(events(1))
+        self.assertEqual(second.stats()["total_events"], 1)
+
+    def test_counters_survive_restart_via_snapshot(self):
+        with mock.patch.object(event_log, "SNAPSHOT_EVERY", 10):
+            log = self.open_log(segment_max_bytes=200, max_segments=2)
+            for i in range(12):
+                log.append_many(events(2, start=2 * i))
+            log.append_many(events(3, event_type="wpm_changed"))
+            expected = log.stats()
+
+        # Most of the events are in deleted segments, so only the snapshot still counts them
+        restarted = self.open_log(segment_max_bytes=200, max_segments=2)
+        self.assertEqual(restarted.stats(), expected)
+        self.assertEqual(expected["total_events"], 27)
+        self.assertEqual(expected["by_type"], {"word_searched": 24, "wpm_changed": 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
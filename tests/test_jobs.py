@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import JobManager, JobRejected
+
+
+class JobManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.manager = JobManager(path=os.path.join(self.directory.name, "jobs.db"), workers=1, max_queued=2)
+
+    def tearDown(self):
+        self.manager.executor.shutdown(wait=True)
+        self.directory.cleanup()
+
+    def finished(self, job_id):
+        job = self.manager.get(job_id)
+        while job["state"] in ("queued", "running"):
+            job = self.manager.wait(job_id, job["version"], timeout=5)
+        return job
+
+    def test_result_and_progress_are_stored(self):
+        def work(job):
+            job.report(0.5, pages=1)
+            return {"words": 3}
+
+        job = self.finished(self.manager.submit("test", "client", work))
+        self.assertEqual(job["state"], "done")
+        self.assertEqual(job["progress"], 1.0)
+        self.assertEqual(job["result"], {"words": 3})
+
+    def test_limits_refuse_with_retry_after(self):
+        started, release = threading.Event(), threading.Event()
+
+        def block(job):
+            started.set()
+            release.wait(5)
+
+        blocked = [self.manager.submit("test", "client0", block)]
+        started.wait(5)
+        # The one worker is busy, so these two fill the queue
+        blocked += [self.manager.submit("test", f"client{n}", block) for n in (1, 2)]
+        with self.assertRaises(JobRejected) as refused:
+            self.manager.submit("test", "client3", lambda job: None)
+        self.assertEqual(refused.exception.retry_after, 5)
+        release.set()
+        for job_id in blocked:
+            self.finished(job_id)
+
+        self.manager.max_queued = 16
+        release.clear()
+        held = [self.manager.submit("test", "busy", lambda job: release.wait(5)) for _ in range(2)]
+        with self.assertRaises(JobRejected):
+            self.manager.submit("test", "busy", lambda job: None)
+        release.set()
+        for job_id in held:
+            self.finished(job_id)
+
+    def test_cancel_stops_queued_and_running_jobs(self):
+        started = threading.Event()
+
+        def work(job):
+            started.set()
+            while True:
+                job.report(0.1)
+
+        running = self.manager.submit("test", "a", work)
+        queued = self.manager.submit("test", "b", lambda job: "never")
+        started.wait(5)
+        self.assertEqual(self.manager.cancel(queued)["state"], "cancelled")
+        self.assertTrue(self.manager.cancel(running)["cancel_requested"])
+        self.assertEqual(self.finished(running)["state"], "cancelled")
+        self.assertEqual(self.finished(queued)["state"], "cancelled")
+        self.assertIsNone(self.manager.cancel("unknown"))
+
+
+if __name__ == "__main__":
+    unittest.main()
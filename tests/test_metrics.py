@@ -0,0 +1,43 @@
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_logging import SampleFilter
+from metrics import Counter, Histogram
+
+
+class MetricsTest(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("t_seconds", "test", labels=("route",), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, "/a")
+
+        lines = histogram.render()
+        self.assertIn('t_seconds_bucket{route="/a",le="0.1"} 2', lines)
+        self.assertIn('t_seconds_bucket{route="/a",le="1"} 3', lines)
+        self.assertIn('t_seconds_bucket{route="/a",le="+Inf"} 4', lines)
+        self.assertIn('t_seconds_count{route="/a"} 4', lines)
+        self.assertIn('t_seconds_sum{route="/a"} 3.65', lines)
+
+    def test_counter_series_per_label_values(self):
+        counter = Counter("t_total", "test", labels=("route", "status"))
+        counter.inc("/a", 404)
+        counter.inc("/a", 404)
+        counter.inc("/b", 500)
+        self.assertEqual(counter.render()[2:], ['t_total{route="/a",status="404"} 2',
+                                                't_total{route="/b",status="500"} 1'])
+
+    def test_sampling_never_drops_warnings(self):
+        sample = SampleFilter()
+        record = logging.LogRecord("rsvp.test", logging.INFO, __file__, 1, "msg", None, None)
+        record.sample_rate = 0
+        self.assertFalse(sample.filter(record))
+        record.levelno = logging.WARNING
+        self.assertTrue(sample.filter(record))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex.from_text("The cat sat on the mat. Concatenate the CAT! tac")
+
+    def test_matches_agree_with_a_linear_scan(self):
+        words = "The cat sat on the mat. Concatenate the CAT! tac".split()
+        for term in ["cat", "at", "c", "the", "conca", "t!", "tca", "zzz"]:
+            expected = [i for i, word in enumerate(words) if term in word.lower()]
+            self.assertEqual(list(self.index.matches(term)), expected, term)
+
+    def test_find_next_wraps_around(self):
+        self.assertEqual(self.index.find_next("cat", -1), (1, 3, False))
+        self.assertEqual(self.index.find_next("cat", 6), (8, 3, False))
+        self.assertEqual(self.index.find_next("cat", 8), (1, 3, True))
+        self.assertEqual(self.index.find_next("dog", 0), (None, 0, False))
+
+    def test_search_is_case_insensitive(self):
+        self.assertEqual(self.index.find_next("CAT", 0), self.index.find_next("cat", 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import re
+import zlib
+from functools import lru_cache
+
+# Same word boundaries as parseText() in script.js: whitespace, hyphens and em dashes
+WORD_PATTERN = re.compile(r"[^\s\-—]+")
+
+PUNCTUATION_PAUSE_MS = 100
+COMMA_PAUSE_MS = 50
+
+
+def tokenize(text):
+    """Split text into words, returning the words and their character offsets"""
+    words = []
+    offsets = []
+    for match in WORD_PATTERN.finditer(text):
+        words.append(match.group())
+        offsets.append(match.start())
+    return words, offsets
+
+
+@lru_cache(maxsize=65536)
+def calculate_focal_index(word):
+    """Calculate which letter should be focal
+
+    The letter is picked from the middle third of the word. The pick is seeded
+    from a checksum of the word so the same word always gets the same focal
+    letter, which lets both the server and the browser cache the result.
+    """
+    if len(word) <= 2:
+        return len(word) // 2
+
+    min_middle = max(1, len(word) // 3)
+    max_middle = min(len(word) - 2, (len(word) * 2) // 3)
+
+    span = max_middle - min_middle + 1
+    return min_middle + zlib.crc32(word.encode("utf-8")) % span
+
+
+def word_duration_ms(word, wpm):
+    """Display time for one word, mirroring the timer in displayNextWord()"""
+    delay_ms = 60000 / wpm
+    extra_pause = len(word) * (delay_ms / 1000) * len(word)
+
+    if any(mark in word for mark in ".!?;:"):
+        extra_pause += PUNCTUATION_PAUSE_MS
+    elif "," in word:
+        extra_pause += COMMA_PAUSE_MS
+
+    return round(delay_ms + extra_pause)
+
+
+def build_layout(text, wpm=None):
+    """Tokenize text once and return the focal layout as columnar arrays"""
+    words, offsets = tokenize(text)
+    layout = {
+        "word_count": len(words),
+        "offsets": offsets,
+        "lengths": [len(word) for word in words],
+        "focal_indices": [calculate_focal_index(word) for word in words],
+    }
+    if wpm:
+        layout["wpm"] = wpm
+        layout["durations_ms"] = [word_duration_ms(word, wpm) for word in words]
+    return layout
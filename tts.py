@@ -0,0 +1,316 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from metrics import stage_timer
+
+# --- CONFIGURATION ---
+VOICE_ID = "pqHfZKP75CvOlQylNhV4"  # Bill voice ID
+MODEL_ID = "eleven_turbo_v2_5"
+# Chunks are whole sentences merged up to this many characters
+MAX_CHUNK_CHARS = 400
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", 4))
+AUDIO_CACHE_DIR = os.path.join("static", "tts")
+AUDIO_CACHE_MAX_FILES = int(os.getenv("TTS_CACHE_MAX_FILES", 2000))
+# Synthesis runs kept around for their audio stream to be fetched
+MAX_RUNS = 64
+# How long a worker streaming another worker's run waits for each chunk file to appear
+CHUNK_WAIT_SECONDS = 60
+CHUNK_POLL_SECONDS = 0.05
+# Chunks named by a run manifest this recent are never pruned, whichever process started the run
+ACTIVE_RUN_SECONDS = 10 * 60
+
+SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+
+
+class ElevenLabsSynthesizer:
+    """Synthesizer backed by the ElevenLabs text-to-speech API"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def synthesize(self, text, voice_id, model_id):
+        audio_generator = self.client.text_to_speech.convert(
+            text=text,
+            voice_id=voice_id,
+            model_id=model_id
+        )
+        return b"".join(audio_generator)
+
+
+class FakeSynthesizer:
+    """Local stand-in that returns silent MP3 frames, one per four characters of text"""
+
+    # MPEG-1 Layer III, 128 kbps, 44.1 kHz frame header followed by a silent body
+    FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def synthesize(self, text, voice_id, model_id):
+        self.calls += 1
+        if self.delay:
+            threading.Event().wait(self.delay)
+        return self.FRAME * max(1, len(text) // 4)
+
+
+def split_sentences(text, max_chars=MAX_CHUNK_CHARS):
+    """Split text into chunks of whole sentences no longer than max_chars
+
+    A single sentence longer than max_chars is split at word boundaries.
+    """
+    chunks = []
+    current = ""
+
+    for sentence in SENTENCE_END.split(text.strip()):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+
+        if not sentence:
+            continue
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def synthetic_alignment(words, wpm):
+    """Word timings derived from the reading speed, since the API gives no timestamps"""
+    ms_per_word = (60 / wpm) * 1000
+    alignment = []
+    current_time = 0
+
+    for word in words:
+        # Adjust duration based on word length
+        word_duration = ms_per_word * (1 + (len(word) - 5) * 0.05)
+        alignment.append({
+            "word": word,
+            "start_time_ms": current_time,
+            "end_time_ms": current_time + word_duration
+        })
+        current_time += word_duration
+
+    return alignment
+
+
+class TTSPipeline:
+    """Synthesizes sentence chunks concurrently and caches each chunk's audio on disk
+
+    A run is one request's list of chunk futures. Its audio can be streamed in
+    chunk order while later chunks are still being synthesized. Each run also
+    leaves a manifest of chunk keys on disk, so another worker process can
+    stream it by waiting for the chunk files to appear.
+    """
+
+    def __init__(self, synthesizer, cache_dir=AUDIO_CACHE_DIR, workers=TTS_WORKERS,
+                 voice_id=VOICE_ID, model_id=MODEL_ID):
+        self.synthesizer = synthesizer
+        self.cache_dir = cache_dir
+        self.voice_id = voice_id
+        self.model_id = model_id
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self.lock = threading.Lock()
+        self.runs = OrderedDict()
+        self.in_flight = {}  # chunk key -> future, so identical chunks are synthesized once
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.writes = 0
+
+        self.runs_dir = os.path.join(cache_dir, "runs")
+        os.makedirs(self.runs_dir, exist_ok=True)
+
+    def chunk_key(self, text):
+        return hashlib.sha256(f"{self.voice_id}\0{self.model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    def chunk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _synthesize_chunk(self, key, text):
+        path = self.chunk_path(key)
+        try:
+            with stage_timer("tts_synthesize"):
+                audio = self.synthesizer.synthesize(text, self.voice_id, self.model_id)
+
+            with stage_timer("tts_write_chunk"):
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(audio)
+                os.replace(tmp_path, path)
+        finally:
+            # A failed chunk is retried by the next request instead of being remembered
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+        with self.lock:
+            self.writes += 1
+            prune = self.writes % 50 == 0
+        if prune:
+            self._prune_cache()
+        return path
+
+    def _active_keys(self):
+        """Chunk keys that a run started here, or recently anywhere, may still stream"""
+        with self.lock:
+            keys = {key for chunks in self.runs.values() for key, _, _ in chunks}
+            keys.update(self.in_flight)
+
+        cutoff = time.time() - ACTIVE_RUN_SECONDS
+        for name in os.listdir(self.runs_dir):
+            path = os.path.join(self.runs_dir, name)
+            try:
+                if name.endswith(".json") and os.path.getmtime(path) >= cutoff:
+                    with open(path, encoding="utf-8") as f:
+                        keys.update(chunk["key"] for chunk in json.load(f))
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        return keys
+
+    def _prune_cache(self):
+        """Drop the least recently used chunks and run manifests beyond their limits
+
+        Chunks cache hits touch, so mtime order is recency order; chunks an
+        active run still needs are kept regardless.
+        """
+        active = {self.chunk_path(key) for key in self._active_keys()}
+        for directory, suffix, limit in ((self.cache_dir, ".mp3", AUDIO_CACHE_MAX_FILES),
+                                         (self.runs_dir, ".json", MAX_RUNS * 4)):
+            entries = []
+            for name in os.listdir(directory):
+                if name.endswith(suffix):
+                    path = os.path.join(directory, name)
+                    if path in active:
+                        continue
+                    try:
+                        entries.append((os.path.getmtime(path), path))
+                    except OSError:
+                        pass
+
+            for _, path in sorted(entries)[:max(0, len(entries) - limit)]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _manifest_path(self, run_id):
+        return os.path.join(self.runs_dir, f"{run_id}.json")
+
+    def _submit_chunk(self, text):
+        key = self.chunk_key(text)
+        path = self.chunk_path(key)
+
+        with self.lock:
+            if key in self.in_flight:
+                self.cache_hits += 1
+                return key, self.in_flight[key]
+            if os.path.exists(path):
+                try:
+                    # Mark it recently used so pruning drops colder chunks first
+                    os.utime(path)
+                except OSError:
+                    pass
+                self.cache_hits += 1
+                future = Future()
+                future.set_result(path)
+                return key, future
+            self.cache_misses += 1
+            future = self.executor.submit(self._synthesize_chunk, key, text)
+            self.in_flight[key] = future
+            return key, future
+
+    def start(self, text):
+        """Split text and submit every chunk, returning (run_id, chunk keys)"""
+        texts = split_sentences(text)
+        submitted = [self._submit_chunk(chunk) for chunk in texts]
+
+        run_id = uuid.uuid4().hex
+        keys = [key for key, _ in submitted]
+        with open(self._manifest_path(run_id), "w", encoding="utf-8") as f:
+            json.dump([{"key": key, "text": chunk} for key, chunk in zip(keys, texts)], f)
+
+        with self.lock:
+            self.runs[run_id] = [(key, future, chunk) for (key, future), chunk in zip(submitted, texts)]
+            while len(self.runs) > MAX_RUNS:
+                self.runs.popitem(last=False)
+
+        return run_id, keys
+
+    def wait_first(self, run_id):
+        """Block until the first chunk is ready, raising its error if it failed"""
+        chunks = self.runs.get(run_id)
+        if chunks:
+            chunks[0][1].result()
+
+    def iter_ready(self, run_id):
+        """Yield (chunks ready, chunk count) as the run's chunks finish, in order, raising a chunk's error"""
+        chunks = self.runs.get(run_id) or []
+        for done, (_, future, _) in enumerate(chunks, start=1):
+            future.result()
+            yield done, len(chunks)
+
+    def has_run(self, run_id):
+        return run_id in self.runs or (run_id.isalnum() and os.path.exists(self._manifest_path(run_id)))
+
+    def _wait_for_chunk(self, key, deadline):
+        """Path of a chunk another process may be synthesizing, or None once deadline (wall clock) passes"""
+        path = self.chunk_path(key)
+        while not os.path.exists(path):
+            if time.time() > deadline:
+                return None
+            time.sleep(CHUNK_POLL_SECONDS)
+        return path
+
+    def _read_chunk(self, key, text, path):
+        """A chunk's audio; one pruned or never written since the run started is synthesized again"""
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    return f.read()
+            except FileNotFoundError:
+                pass
+        _, future = self._submit_chunk(text)
+        with open(future.result(), "rb") as f:
+            return f.read()
+
+    def iter_audio(self, run_id):
+        """Yield the run's audio chunk by chunk, in order, as each one finishes"""
+        chunks = self.runs.get(run_id)
+        if chunks is not None:
+            for key, future, text in chunks:
+                yield self._read_chunk(key, text, future.result())
+            return
+
+        manifest = self._manifest_path(run_id)
+        # The process that started the run has had until then to write its chunks
+        deadline = os.path.getmtime(manifest) + CHUNK_WAIT_SECONDS
+        with open(manifest, encoding="utf-8") as f:
+            chunks = json.load(f)
+        for chunk in chunks:
+            yield self._read_chunk(chunk["key"], chunk["text"], self._wait_for_chunk(chunk["key"], deadline))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "in_flight": len(self.in_flight),
+                "runs": len(self.runs)
+            }
@@ -0,0 +1,159 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+
+# --- CONFIGURATION ---
+WORD_STORE_DIR = os.getenv("WORD_STORE_DIR", os.path.join("cache", "words"))
+# Stored documents kept on disk; the least recently written are removed beyond this
+WORD_STORE_MAX_FILES = int(os.getenv("WORD_STORE_MAX_FILES", 500))
+# Documents kept memory-mapped per process
+MAX_OPEN = 32
+
+# File layout, all little-endian:
+#   header   magic, word count
+#   offsets  uint32[count + 1], byte offset of each word in the text block
+#   focal    uint16[count], focal letter of each word
+#   text     the words' UTF-8 bytes back to back
+MAGIC = b"RSVPWRD1"
+HEADER = struct.Struct("<8sI")
+# Binary window on the wire: start, count and document word count, then the
+# window's focal uint16s, its offsets (rebased to 0) as uint32s and its text
+WINDOW_HEADER = struct.Struct("<III")
+
+BIG_ENDIAN = sys.byteorder == "big"
+
+
+def _to_le(values):
+    if BIG_ENDIAN:
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if BIG_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def encode_document(words, focal_indices):
+    """Serialize a document's words and focal letters into the store's file format"""
+    encoded = [word.encode("utf-8") for word in words]
+    offsets = array("I", [0])
+    for word in encoded:
+        offsets.append(offsets[-1] + len(word))
+    focal = array("H", (min(index, 0xFFFF) for index in focal_indices))
+    return b"".join([HEADER.pack(MAGIC, len(words)), _to_le(offsets), _to_le(focal), *encoded])
+
+
+class DocumentWords:
+    """One stored document, memory-mapped so a window read touches only its own pages"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.word_count = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a word store file")
+        self._offsets_at = HEADER.size
+        self._focal_at = self._offsets_at + 4 * (self.word_count + 1)
+        self._text_at = self._focal_at + 2 * self.word_count
+
+    def _clamp(self, start, count):
+        start = max(0, min(start, self.word_count))
+        return start, max(0, min(count, self.word_count - start))
+
+    def _slices(self, start, count):
+        offsets = _from_le("I", self._map[self._offsets_at + 4 * start:self._offsets_at + 4 * (start + count + 1)])
+        focal = self._map[self._focal_at + 2 * start:self._focal_at + 2 * (start + count)]
+        text = self._map[self._text_at + offsets[0]:self._text_at + offsets[-1]]
+        return offsets, focal, text
+
+    def window(self, start, count):
+        """Return (start, words, focal indices) for up to count words from start"""
+        start, count = self._clamp(start, count)
+        offsets, focal, text = self._slices(start, count)
+        base = offsets[0]
+        words = [text[offsets[i] - base:offsets[i + 1] - base].decode("utf-8") for i in range(count)]
+        return start, words, list(_from_le("H", focal))
+
+    def window_bytes(self, start, count):
+        """The same window in the binary wire format, copied straight out of the map"""
+        start, count = self._clamp(start, count)
+        offsets, focal, text = self._slices(start, count)
+        base = offsets[0]
+        rebased = array("I", (offset - base for offset in offsets))
+        return WINDOW_HEADER.pack(start, count, self.word_count) + focal + _to_le(rebased) + text
+
+
+class WordStore:
+    """Tokenized documents on disk, one file per document id, read through mmap"""
+
+    def __init__(self, directory=WORD_STORE_DIR, max_files=WORD_STORE_MAX_FILES, max_open=MAX_OPEN):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_open = max_open
+        self.lock = threading.Lock()
+        self._open = OrderedDict()  # document id -> DocumentWords, least recently used first
+        self.writes = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, document_id):
+        return os.path.join(self.directory, f"{document_id}.words")
+
+    def write(self, document_id, words, focal_indices):
+        path = self._path(document_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(encode_document(words, focal_indices))
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            # A mapping of the file this replaced would keep serving the old contents
+            self._open.pop(document_id, None)
+            self.writes += 1
+            prune = self.writes % 20 == 0
+        if prune:
+            self._prune()
+
+    def open(self, document_id):
+        """The stored document, or None if it isn't on disk"""
+        with self.lock:
+            document = self._open.get(document_id)
+            if document is not None:
+                self._open.move_to_end(document_id)
+                return document
+
+        try:
+            document = DocumentWords(self._path(document_id))
+        except (OSError, ValueError, struct.error):
+            return None
+
+        with self.lock:
+            self._open[document_id] = document
+            # Mappings are closed when the last request using them lets go
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+        return document
+
+    def _prune(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".words"):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+
+        for _, path in sorted(entries)[:max(0, len(entries) - self.max_files)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,12 @@
+"""WSGI entry point for running the backend under several worker processes
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Session state, events, the document cache and TTS runs are all shared
+through files under data/, cache/ and static/tts/, so any worker can serve
+any request. Each worker builds its own app, then loads PDF extraction,
+language detection and TTS in the background while it already serves.
+"""
+from main import create_app
+
+app = create_app()